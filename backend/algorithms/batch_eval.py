@@ -0,0 +1,117 @@
+from functools import lru_cache
+from itertools import permutations
+import numpy as np
+from algorithms.bitmask_solver import prepare_colors, count_solutions as search_count
+import metrics
+
+# Boards are scored in chunks to bound the size of temporary arrays
+CHUNK_SIZE = 65536
+# Up to this size every permutation board is scored directly
+MAX_PERMUTATION_SIZE = 9
+
+
+def color_table(colors):
+    cell_color, _ = prepare_colors(colors)
+    return np.asarray(cell_color, dtype=np.int16)
+
+
+def _invalid_rows(boards, table):
+    # Row j is invalid when its queen attacks, or shares a color region
+    # with, the queen of an earlier row j - k; one pass per offset k
+    n = boards.shape[1]
+    placed = boards >= 0
+    cols = np.where(placed, boards, 0)
+    region = table[np.arange(n), cols]
+
+    mask = np.zeros(boards.shape, dtype=bool)
+    for k in range(1, n):
+        dc = np.abs(cols[:, k:] - cols[:, :-k])
+        hit = (dc == 0) | (dc == k) | (region[:, k:] == region[:, :-k])
+        mask[:, k:] |= hit & placed[:, k:] & placed[:, :-k]
+    return mask
+
+
+def invalid_rows_mask(boards, colors):
+    # (N, n) mask of the rows that conflict with an earlier row, the same
+    # rows dp_validator.conflicting_rows reports
+    boards = np.asarray(boards, dtype=np.int16)
+    if boards.ndim != 2:
+        raise ValueError("boards must be an (N, n) array")
+    n = boards.shape[1]
+    if len(colors) != n:
+        raise ValueError(f"boards have {n} rows but the color map has {len(colors)}")
+    if boards.size and (boards.min() < -1 or boards.max() >= n):
+        raise ValueError(f"columns must be between -1 and {n - 1}")
+
+    table = color_table(colors)
+    mask = np.empty(boards.shape, dtype=bool)
+    for start in range(0, len(boards), CHUNK_SIZE):
+        mask[start:start + CHUNK_SIZE] = _invalid_rows(boards[start:start + CHUNK_SIZE], table)
+    return mask
+
+
+@metrics.timed
+def evaluate(boards, colors):
+    # (valid, invalid_rows) for every board; valid matches is_valid_board
+    mask = invalid_rows_mask(boards, colors)
+    return ~mask.any(axis=1), mask
+
+
+def is_valid_many(boards, colors):
+    valid, _ = evaluate(boards, colors)
+    return valid.tolist()
+
+
+def conflicting_rows_many(boards, colors):
+    _, mask = evaluate(boards, colors)
+    return [np.flatnonzero(row).tolist() for row in mask]
+
+
+@lru_cache(maxsize=MAX_PERMUTATION_SIZE)
+def permutation_boards(n):
+    # Every board with one queen per row and column
+    return np.array(list(permutations(range(n))), dtype=np.int8)
+
+
+def count_solutions(colors):
+    n = len(colors)
+    if n > MAX_PERMUTATION_SIZE:
+        return search_count(colors)
+    valid, _ = evaluate(permutation_boards(n), colors)
+    return int(valid.sum())
+
+
+def count_solutions_many(maps):
+    return [count_solutions(colors) for colors in maps]
+
+
+def _connected(cells):
+    seen = {cells[0]}
+    stack = [cells[0]]
+    remaining = set(cells)
+    while stack:
+        r, c = stack.pop()
+        for cell in ((r + 1, c), (r - 1, c), (r, c + 1), (r, c - 1)):
+            if cell in remaining and cell not in seen:
+                seen.add(cell)
+                stack.append(cell)
+    return len(seen) == len(cells)
+
+
+def region_report(colors):
+    # Shape checks for a color map: square, n regions, each one connected
+    n = len(colors)
+    square = n > 0 and all(len(row) == n for row in colors)
+    regions = {}
+    for r, row in enumerate(colors):
+        for c, color in enumerate(row):
+            regions.setdefault(color, []).append((r, c))
+    disconnected = [color for color, cells in regions.items() if not _connected(cells)]
+    return {
+        "size": n,
+        "square": square,
+        "regions": len(regions),
+        "region_sizes": {color: len(cells) for color, cells in regions.items()},
+        "disconnected": disconnected,
+        "valid": square and len(regions) == n and not disconnected,
+    }
@@ -0,0 +1,137 @@
+import metrics
+
+
+def prepare_colors(colors):
+    # Map arbitrary color values to 0..k-1 and precompute, for every row,
+    # the mask of columns that belong to each color region.
+    n = len(colors)
+    ids = {}
+    for row in colors:
+        for color in row:
+            if color not in ids:
+                ids[color] = len(ids)
+
+    region_cols = [[0] * len(ids) for _ in range(n)]
+    for r, row in enumerate(colors):
+        for c, color in enumerate(row):
+            region_cols[r][ids[color]] |= 1 << c
+
+    cell_color = [[ids[color] for color in row] for row in colors]
+    return cell_color, region_cols
+
+
+def _block(avail, region_cols, n, row, col, color):
+    # Remove every cell attacked by a queen at (row, col) from the other rows
+    new_avail = avail[:]
+    new_avail[row] = 0
+    for r in range(n):
+        mask = new_avail[r]
+        if not mask:
+            continue
+        d = r - row
+        mask &= ~(1 << col)
+        if 0 <= col + d < n:
+            mask &= ~(1 << (col + d))
+        if 0 <= col - d < n:
+            mask &= ~(1 << (col - d))
+        new_avail[r] = mask & ~region_cols[r][color]
+    return new_avail
+
+
+def iter_solutions(colors, board=None):
+    n = len(colors)
+    if n == 0:
+        return
+    cell_color, region_cols = prepare_colors(colors)
+    k = len(region_cols[0])
+    if k < n:
+        # Every row needs a queen of a distinct color
+        return
+
+    full = (1 << n) - 1
+    avail = [full] * n
+    placed = [-1] * n
+    used = 0
+
+    # Placed queens are fixed constraints for the search
+    if board is not None:
+        for row, col in enumerate(board):
+            if col == -1:
+                continue
+            if not (avail[row] >> col) & 1:
+                return
+            color = cell_color[row][col]
+            avail = _block(avail, region_cols, n, row, col, color)
+            placed[row] = col
+            used |= 1 << color
+
+    # With exactly n regions every region must also hold a queen, so we can
+    # branch on whichever row or region has the fewest candidate cells.
+    regions_required = k == n
+
+    def search(avail, used, left):
+        if left == 0:
+            yield placed[:]
+            return
+
+        best_row, best_count = -1, n + 1
+        for r in range(n):
+            if placed[r] != -1:
+                continue
+            count = avail[r].bit_count()
+            if count == 0:
+                return
+            if count < best_count:
+                best_row, best_count = r, count
+
+        best_region, best_cells = -1, None
+        if regions_required and best_count > 1:
+            for color in range(k):
+                if (used >> color) & 1:
+                    continue
+                cells = []
+                for r in range(n):
+                    mask = avail[r] & region_cols[r][color]
+                    while mask:
+                        low = mask & -mask
+                        cells.append((r, low.bit_length() - 1))
+                        mask ^= low
+                if not cells:
+                    return
+                if len(cells) < best_count and (best_cells is None or len(cells) < len(best_cells)):
+                    best_region, best_cells = color, cells
+
+        if best_cells is not None:
+            candidates = best_cells
+        else:
+            candidates = []
+            mask = avail[best_row]
+            while mask:
+                low = mask & -mask
+                candidates.append((best_row, low.bit_length() - 1))
+                mask ^= low
+
+        for r, c in candidates:
+            color = cell_color[r][c]
+            placed[r] = c
+            yield from search(_block(avail, region_cols, n, r, c, color), used | (1 << color), left - 1)
+            placed[r] = -1
+
+    yield from search(avail, used, placed.count(-1))
+
+
+@metrics.timed
+def solve_n_queens(n, colors):
+    if n != len(colors):
+        return None
+    return next(iter_solutions(colors), None)
+
+
+@metrics.timed
+def count_solutions(colors, limit=None):
+    count = 0
+    for _ in iter_solutions(colors):
+        count += 1
+        if limit is not None and count >= limit:
+            break
+    return count
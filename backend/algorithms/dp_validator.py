@@ -1,36 +1,44 @@
-from functools import lru_cache
+from algorithms import trace
+import metrics
 
-@lru_cache(maxsize=None)
+
+@metrics.timed
 def is_valid_board(board, colors):
     n = len(board)
     col_mask = 0
     diag1_mask = 0
     diag2_mask = 0
     color_queen = {}
+    tracing = trace.enabled(__name__)
 
     for row in range(n):
         col = board[row]
         if col == -1:
             continue
 
-        print(f"Row {row}, Col {col}, Color {colors[row][col]}")
-        
+        if tracing:
+            trace.record(__name__, "row", row=row, col=col, color=colors[row][col])
+
         if (col_mask >> col) & 1:
-            print(f"❌ Column conflict at {col}")
+            if tracing:
+                trace.record(__name__, "conflict", kind="column", row=row, col=col)
             return False
 
         d1 = row - col + n - 1
         d2 = row + col
         if (diag1_mask >> d1) & 1:
-            print(f"❌ Diagonal1 conflict at row {row}, col {col}")
+            if tracing:
+                trace.record(__name__, "conflict", kind="diagonal1", row=row, col=col)
             return False
         if (diag2_mask >> d2) & 1:
-            print(f"❌ Diagonal2 conflict at row {row}, col {col}")
+            if tracing:
+                trace.record(__name__, "conflict", kind="diagonal2", row=row, col=col)
             return False
 
         color = colors[row][col]
         if color in color_queen:
-            print(f"❌ Color conflict for color {color} at row {row}")
+            if tracing:
+                trace.record(__name__, "conflict", kind="color", row=row, col=col, color=color)
             return False
 
         col_mask |= (1 << col)
@@ -38,5 +46,36 @@ def is_valid_board(board, colors):
         diag2_mask |= (1 << d2)
         color_queen[color] = True
 
-    print("✅ Board is valid!")
+    if tracing:
+        trace.record(__name__, "valid")
     return True
+
+
+@metrics.timed
+def conflicting_rows(board, colors):
+    # Rows whose queen is attacked by a queen in an earlier row or repeats
+    # an earlier queen's color region.
+    n = len(board)
+    col_mask = 0
+    diag1_mask = 0
+    diag2_mask = 0
+    used_colors = set()
+    invalid = []
+
+    for row in range(n):
+        col = board[row]
+        if col == -1:
+            continue
+
+        d1 = row - col + n - 1
+        d2 = row + col
+        color = colors[row][col]
+        if (col_mask >> col) & 1 or (diag1_mask >> d1) & 1 or (diag2_mask >> d2) & 1 or color in used_colors:
+            invalid.append(row)
+
+        col_mask |= (1 << col)
+        diag1_mask |= (1 << d1)
+        diag2_mask |= (1 << d2)
+        used_colors.add(color)
+
+    return invalid
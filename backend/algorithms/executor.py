@@ -0,0 +1,182 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from threading import Lock
+from algorithms import trace
+import metrics
+
+# ALGO_EXECUTOR is "process" (default), "thread" or "inline". Inline runs the
+# function in the caller, which is what scripts and benchmarks get when the
+# executor was never started.
+ALGO_EXECUTOR = os.getenv("ALGO_EXECUTOR", "process")
+ALGO_WORKERS = int(os.getenv("ALGO_WORKERS", str(os.cpu_count() or 1)))
+ALGO_TASK_TIMEOUT = float(os.getenv("ALGO_TASK_TIMEOUT", "10"))
+# Tasks allowed in flight (running or queued) before new ones are rejected;
+# 0 lets every task queue in the pool instead
+ALGO_MAX_PENDING = int(os.getenv("ALGO_MAX_PENDING", str(ALGO_WORKERS * 4)))
+
+
+class ExecutorSaturated(Exception):
+    pass
+
+
+class TaskTimeout(Exception):
+    pass
+
+
+def _run_timed(fn, args, trace_context, ship_calls):
+    # Runs in the worker; the running time comes back with the result so the
+    # time spent queued can be told apart, and so do the trace events and
+    # (from worker processes) the algorithm timings, which would otherwise
+    # stay in the worker's own buffer and histograms
+    before = metrics.algorithm_calls.snapshot() if ship_calls else None
+    start = time.perf_counter()
+    if trace_context is None:
+        result, events = fn(*args), None
+    else:
+        with trace.collect(trace_context) as events:
+            result = fn(*args)
+    running = time.perf_counter() - start
+    return result, running, events, metrics.algorithm_calls.since(before) if ship_calls else None
+
+
+class AlgorithmExecutor:
+    def __init__(self, kind=ALGO_EXECUTOR, workers=ALGO_WORKERS, timeout=ALGO_TASK_TIMEOUT,
+                 max_pending=ALGO_MAX_PENDING, name="algorithms"):
+        self.name = name
+        self.kind = kind
+        self.workers = workers
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.restarts = 0
+        self._pool = None
+        self._ship_calls = False
+        self._lock = Lock()
+
+    def _new_pool(self):
+        if self.kind == "process":
+            # spawn avoids forking a process that already runs threads
+            self._ship_calls = metrics.METRICS_ENABLED
+            return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        if self.kind == "thread":
+            return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="algorithms")
+        return None
+
+    def start(self):
+        self._pool = self._new_pool()
+
+    def _restart(self, broken):
+        # A worker process that dies (killed, out of memory) breaks the whole
+        # pool and every later submit fails, so the pool is built again. Of
+        # the tasks that saw the same broken pool only the first rebuilds it.
+        with self._lock:
+            if self._pool is not broken:
+                return
+            self._pool = self._new_pool()
+            self.restarts += 1
+        # Outside the lock: cancelled futures run _done, which takes it
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _submit(self, pool, fn, args):
+        with self._lock:
+            if self.max_pending and self.pending >= self.max_pending:
+                self.rejected += 1
+                raise ExecutorSaturated(f"{self.pending} algorithm tasks already pending")
+            self.pending += 1
+
+        try:
+            future = pool.submit(_run_timed, fn, args, trace.context(), self._ship_calls)
+        except Exception:
+            self._done(None)
+            raise
+        # A task that timed out still occupies its worker until it finishes,
+        # so it keeps counting against max_pending until then.
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, _future):
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+
+    def _finish_task(self, fn, elapsed, running, events, calls):
+        if events:
+            trace.extend(events)
+        if calls:
+            metrics.algorithm_calls.merge(calls)
+        self._observe(fn, elapsed, running)
+        metrics.add_algorithm_time(elapsed)
+
+    def _observe(self, fn, elapsed, running):
+        if not metrics.METRICS_ENABLED:
+            return
+        name = getattr(fn, "__qualname__", str(fn))
+        metrics.algorithm_tasks.observe((self.name, name, "queued"), max(elapsed - running, 0.0))
+        metrics.algorithm_tasks.observe((self.name, name, "running"), running)
+
+    # A task that hits a broken pool is retried once on the rebuilt one; if
+    # that breaks too the caller gets ExecutorSaturated (503), not a crash.
+    async def run(self, fn, *args, timeout=None):
+        for _ in range(2):
+            pool = self._pool
+            if pool is None:
+                return fn(*args)
+            start = time.perf_counter()
+            try:
+                future = asyncio.wrap_future(self._submit(pool, fn, args))
+                result, running, events, calls = await asyncio.wait_for(asyncio.shield(future), timeout or self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise TaskTimeout(f"{getattr(fn, '__name__', fn)} exceeded {timeout or self.timeout}s")
+            except BrokenExecutor:
+                self._restart(pool)
+                continue
+            self._finish_task(fn, time.perf_counter() - start, running, events, calls)
+            return result
+        raise ExecutorSaturated("algorithm workers keep crashing")
+
+    def call(self, fn, *args, timeout=None):
+        # Blocking variant for sync handlers and background threads
+        for _ in range(2):
+            pool = self._pool
+            if pool is None:
+                return fn(*args)
+            start = time.perf_counter()
+            try:
+                result, running, events, calls = self._submit(pool, fn, args).result(timeout or self.timeout)
+            except FutureTimeoutError:
+                self.timeouts += 1
+                raise TaskTimeout(f"{getattr(fn, '__name__', fn)} exceeded {timeout or self.timeout}s")
+            except BrokenExecutor:
+                self._restart(pool)
+                continue
+            self._finish_task(fn, time.perf_counter() - start, running, events, calls)
+            return result
+        raise ExecutorSaturated("algorithm workers keep crashing")
+
+    def stats(self):
+        return {
+            "kind": self.kind if self._pool else "inline",
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "restarts": self.restarts,
+        }
+
+
+algorithm_executor = AlgorithmExecutor()
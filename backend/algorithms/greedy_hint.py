@@ -1,69 +1,48 @@
-def get_next_hint(board, colors):
-    n = len(board)
-    
-    def is_safe(board, row, col):
-        for r in range(row):
-            c = board[r]
-            if c == col or abs(row - r) == abs(col - c):
-                return False
-        return True
-
-    def is_color_safe(used_colors, row, col):
-        color = colors[row][col]
-        if color in used_colors:
-            return False
-        return True
-
-    def is_valid_board(board, colors):
-        used_colors = set()
-        invalid_rows = []
-        
-        for row in range(n):
-            col = board[row]
-            if col != -1:
-                if not is_safe(board, row, col):
-                    invalid_rows.append(row)
-                color = colors[row][col]
-                if color in used_colors:
-                    invalid_rows.append(row)
-                used_colors.add(color)
-
-        return invalid_rows
+from algorithms import trace
+from algorithms.bitmask_solver import iter_solutions
+from algorithms.dp_validator import conflicting_rows
+import metrics
 
-    def backtrack(row, used_colors):
-        if row == n:
-            return True
-        
-        for col in range(n):
-            if is_safe(board, row, col) and is_color_safe(used_colors, row, col):
-                board[row] = col
-                color = colors[row][col]
-                used_colors.add(color)
 
-                if backtrack(row + 1, used_colors):
-                    return True
+@metrics.timed
+def get_next_hint(board, colors):
+    # The player's queens are fixed constraints; the board is never mutated
+    n = len(board)
+    tracing = trace.enabled(__name__)
 
-                board[row] = -1
-                used_colors.remove(color)
-        
-        return False
+    invalid_rows = conflicting_rows(board, colors)
+    if invalid_rows:
+        if tracing:
+            trace.record(__name__, "invalid", rows=invalid_rows)
+        return {"hint": None, "invalid": invalid_rows}
 
-    used_colors = set()
     next_row = next((r for r in range(n) if board[r] == -1), None)
-    
     if next_row is None:
-        print("All queens are placed. No further hints available.")
+        if tracing:
+            trace.record(__name__, "board_full")
         return {"hint": None, "invalid": []}
 
-    if backtrack(0, used_colors):
-        print("Board is valid!")
-        invalid_rows = is_valid_board(board, colors)
-        
-        if invalid_rows:
-            print(f"Invalid queens found at rows: {invalid_rows}")
-            return {"hint": None, "invalid": invalid_rows}
-        
-        return {"hint": (next_row, board[next_row]), "invalid": []}
-    else:
-        print("No valid placement found.")
+    # Only the empty rows are searched
+    solution = next(iter_solutions(colors, board), None)
+    if solution is not None:
+        if tracing:
+            trace.record(__name__, "hint", row=next_row, col=solution[next_row])
+        return {"hint": (next_row, solution[next_row]), "invalid": []}
+
+    # The queens don't attack each other but can't be completed: point at
+    # the ones that differ from a full solution.
+    solution = next(iter_solutions(colors), None)
+    if solution is None:
+        if tracing:
+            trace.record(__name__, "no_solution")
         return {"hint": None, "invalid": []}
+
+    invalid_rows = [row for row, col in enumerate(board) if col != -1 and solution[row] != col]
+    if tracing:
+        trace.record(__name__, "dead_end", rows=invalid_rows)
+    return {"hint": None, "invalid": invalid_rows}
+
+
+@metrics.timed
+def get_next_hints(boards, colors):
+    return [get_next_hint(board, colors) for board in boards]
@@ -0,0 +1,129 @@
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor
+from algorithms.bitmask_solver import iter_solutions
+import metrics
+
+SIZES = range(6, 15)
+# Smaller boards (other than the trivial 1x1) have no N-Queens solution
+MIN_SIZE = 4
+# Fresh region layouts tried before giving up on a queen placement
+MAX_LAYOUTS = 20
+# Cells moved between regions per layout while removing other solutions
+MAX_REPAIRS = 60
+
+
+def random_queens(n, rng):
+    # A random solution of the plain N-Queens problem
+    cols = list(range(n))
+    placed = []
+
+    def search(row, used, diag1, diag2):
+        if row == n:
+            return True
+        rng.shuffle(cols)
+        for col in list(cols):
+            d1, d2 = row - col + n - 1, row + col
+            if (used >> col) & 1 or (diag1 >> d1) & 1 or (diag2 >> d2) & 1:
+                continue
+            placed.append(col)
+            if search(row + 1, used | 1 << col, diag1 | 1 << d1, diag2 | 1 << d2):
+                return True
+            placed.pop()
+        return False
+
+    return placed if search(0, 0, 0, 0) else None
+
+
+def neighbours(n, r, c):
+    for nr, nc in ((r + 1, c), (r - 1, c), (r, c + 1), (r, c - 1)):
+        if 0 <= nr < n and 0 <= nc < n:
+            yield nr, nc
+
+
+def grow_regions(n, queens, rng):
+    # Every queen seeds a region; regions then take random bordering cells
+    # until the grid is covered, so the queens always form a solution
+    colors = [[0] * n for _ in range(n)]
+    frontier = []
+    for row, col in enumerate(queens):
+        colors[row][col] = row + 1
+        frontier.extend((row + 1, cell) for cell in neighbours(n, row, col))
+
+    while frontier:
+        color, (r, c) = frontier.pop(rng.randrange(len(frontier)))
+        if colors[r][c]:
+            continue
+        colors[r][c] = color
+        frontier.extend((color, cell) for cell in neighbours(n, r, c) if not colors[cell[0]][cell[1]])
+    return colors
+
+
+def _connected_without(colors, n, cell):
+    # Whether cell's region stays connected once cell is taken out of it
+    color = colors[cell[0]][cell[1]]
+    cells = [(r, c) for r in range(n) for c in range(n) if colors[r][c] == color and (r, c) != cell]
+    if not cells:
+        return False
+    seen = {cells[0]}
+    stack = [cells[0]]
+    while stack:
+        r, c = stack.pop()
+        for nr, nc in neighbours(n, r, c):
+            if (nr, nc) != cell and (nr, nc) not in seen and colors[nr][nc] == color:
+                seen.add((nr, nc))
+                stack.append((nr, nc))
+    return len(seen) == len(cells)
+
+
+def _break_solution(colors, n, queens, other, rng):
+    # Move one of the other solution's queen cells into a bordering region
+    # that holds another of its queens, which rules that solution out
+    rows = [row for row in range(n) if other[row] != queens[row]]
+    rng.shuffle(rows)
+    other_regions = {colors[row][col] for row, col in enumerate(other)}
+    for row in rows:
+        cell = (row, other[row])
+        own = colors[row][other[row]]
+        targets = {colors[r][c] for r, c in neighbours(n, *cell)} & other_regions - {own}
+        if targets and _connected_without(colors, n, cell):
+            colors[row][other[row]] = rng.choice(sorted(targets))
+            return True
+    return False
+
+
+@metrics.timed
+def generate_queens_map(size=8, rng=None):
+    # (colors, solution): a map with size regions, numbered from 1, whose
+    # only solution is the returned one. size may be given as a string, the
+    # way puzzle pools name their queues.
+    n = int(size)
+    if n < MIN_SIZE:
+        raise ValueError(f"N-Queens maps need at least {MIN_SIZE} rows, got {n}")
+    rng = rng or random.Random()
+    while True:
+        queens = random_queens(n, rng)
+        for _ in range(MAX_LAYOUTS):
+            colors = grow_regions(n, queens, rng)
+            for _ in range(MAX_REPAIRS):
+                other = next((s for s in iter_solutions(colors) if s != queens), None)
+                if other is None:
+                    return colors, queens
+                if not _break_solution(colors, n, queens, other, rng):
+                    break
+
+
+def _generate_batch(size, count, seed):
+    rng = random.Random(seed)
+    return [generate_queens_map(size, rng) for _ in range(count)]
+
+
+def generate_maps(size, count, workers=1):
+    # Batch mode: count maps split across worker processes
+    if workers <= 1:
+        return _generate_batch(size, count, None)
+    shares = [count // workers + (i < count % workers) for i in range(workers)]
+    seeds = [random.getrandbits(64) for _ in shares]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        batches = pool.map(_generate_batch, [size] * workers, shares, seeds)
+        return [entry for batch in batches for entry in batch]
@@ -0,0 +1,107 @@
+from algorithms.bitmask_solver import prepare_colors
+
+
+class QueensState:
+    # N-Queens board that is updated one move at a time. Every column,
+    # diagonal and color region keeps the rows of the queens on it, and the
+    # occupancy bitmasks mirror which of those lines are non-empty, so a
+    # place or remove only touches the four lines through that cell.
+    def __init__(self, colors, board=None):
+        self.n = len(colors)
+        self.cell_color, _ = prepare_colors(colors)
+        n = self.n
+        self.board = [-1] * n
+        self.lines = {
+            "column": [set() for _ in range(n)],
+            "diagonal1": [set() for _ in range(2 * n - 1)],
+            "diagonal2": [set() for _ in range(2 * n - 1)],
+            "color": [set() for _ in range(max((max(row) for row in self.cell_color), default=-1) + 1)],
+        }
+        self.masks = dict.fromkeys(self.lines, 0)
+        # Number of other queens attacking the queen in each row
+        self.attackers = [0] * n
+        self.invalid = set()
+        self.placed = 0
+        self.conflicts = 0
+
+        for row, col in enumerate(board or []):
+            if col != -1:
+                self.place(row, col)
+
+    def _line_ids(self, row, col):
+        return (
+            ("column", col),
+            ("diagonal1", row - col + self.n - 1),
+            ("diagonal2", row + col),
+            ("color", self.cell_color[row][col]),
+        )
+
+    def _attack(self, row, others, delta):
+        for other in others:
+            self.attackers[other] += delta
+            if self.attackers[other]:
+                self.invalid.add(other)
+            else:
+                self.invalid.discard(other)
+        self.attackers[row] += delta * len(others)
+        self.conflicts += delta * len(others)
+
+    def check(self, row, col):
+        if not (0 <= row < self.n and 0 <= col < self.n):
+            raise ValueError(f"({row}, {col}) is outside the {self.n}x{self.n} board")
+
+    def place(self, row, col):
+        # Moves the row's queen if it already has one
+        self.check(row, col)
+        if self.board[row] == col:
+            return
+        if self.board[row] != -1:
+            self.remove(row)
+
+        for kind, line in self._line_ids(row, col):
+            rows = self.lines[kind][line]
+            self._attack(row, rows, 1)
+            rows.add(row)
+            self.masks[kind] |= 1 << line
+        if self.attackers[row]:
+            self.invalid.add(row)
+        self.board[row] = col
+        self.placed += 1
+
+    def remove(self, row):
+        self.check(row, 0)
+        col = self.board[row]
+        if col == -1:
+            return
+
+        for kind, line in self._line_ids(row, col):
+            rows = self.lines[kind][line]
+            rows.discard(row)
+            self._attack(row, rows, -1)
+            if not rows:
+                self.masks[kind] &= ~(1 << line)
+        self.invalid.discard(row)
+        self.board[row] = -1
+        self.placed -= 1
+
+    def attacked_by(self, row):
+        col = self.board[row]
+        if col == -1:
+            return []
+        rows = set()
+        for kind, line in self._line_ids(row, col):
+            rows |= self.lines[kind][line]
+        rows.discard(row)
+        return sorted(rows)
+
+    def is_free(self, row, col):
+        # No queen shares a column, diagonal or color region with (row, col)
+        return not any((self.masks[kind] >> line) & 1 for kind, line in self._line_ids(row, col))
+
+    @property
+    def valid(self):
+        return self.conflicts == 0
+
+    @property
+    def complete(self):
+        return self.placed == self.n and self.conflicts == 0
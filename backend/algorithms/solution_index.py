@@ -0,0 +1,144 @@
+import os
+from collections import OrderedDict
+from threading import Lock
+from colors import predefined_colors
+from ttl_cache import TTLCache
+from algorithms.bitmask_solver import iter_solutions
+from algorithms.dp_validator import conflicting_rows
+import metrics
+
+# Maps with more solutions than this are answered by search instead
+MAX_SOLUTIONS = 4096
+# Number of distinct color maps kept indexed at once
+MAX_INDEXES = 32
+# Generated maps have a single, already known solution; their indexes are
+# kept apart so per-player maps don't push the shared maps out
+GENERATED_INDEX_SIZE = int(os.getenv("GENERATED_INDEX_SIZE", "4096"))
+GENERATED_INDEX_TTL = float(os.getenv("GENERATED_INDEX_TTL", "3600"))
+
+
+class SolutionIndex:
+    def __init__(self, colors, solutions):
+        self.n = len(colors)
+        self.colors = colors
+        self.solutions = solutions
+        self.all_bits = (1 << len(solutions)) - 1
+
+        # cell_bits[row][col] is the bitset of solutions with a queen on (row, col)
+        self.cell_bits = [[0] * self.n for _ in range(self.n)]
+        for i, solution in enumerate(solutions):
+            bit = 1 << i
+            for row, col in enumerate(solution):
+                self.cell_bits[row][col] |= bit
+
+    def solution(self):
+        return self.solutions[0][:] if self.solutions else None
+
+    def consistent(self, board):
+        bits = self.all_bits
+        for row, col in enumerate(board):
+            if col != -1:
+                bits &= self.cell_bits[row][col]
+                if not bits:
+                    break
+        return bits
+
+    def invalid_rows(self, board):
+        invalid = conflicting_rows(board, self.colors)
+        if invalid or self.consistent(board):
+            return invalid
+
+        # No direct conflicts: blame queens that appear in no solution, then
+        # fall back to the queens that differ from the closest solution.
+        invalid = [row for row, col in enumerate(board) if col != -1 and not self.cell_bits[row][col]]
+        if invalid or not self.solutions:
+            return invalid
+
+        closest = max(self.solutions, key=lambda s: sum(1 for row, col in enumerate(board) if s[row] == col))
+        return [row for row, col in enumerate(board) if col != -1 and closest[row] != col]
+
+    @metrics.timed
+    def next_hint(self, board):
+        next_row = next((r for r in range(self.n) if board[r] == -1), None)
+        bits = self.consistent(board)
+
+        if next_row is None or not bits:
+            return {"hint": None, "invalid": self.invalid_rows(board)}
+
+        solution = self.solutions[(bits & -bits).bit_length() - 1]
+        return {"hint": (next_row, solution[next_row]), "invalid": []}
+
+
+_indexes = OrderedDict()
+_lock = Lock()
+_generated = TTLCache(maxsize=GENERATED_INDEX_SIZE, ttl=GENERATED_INDEX_TTL)
+# Maps the server hands out itself; only these get an index built on demand.
+# Any other map a client sends is answered by search, so made-up maps can't
+# keep the workers busy building indexes nobody will reuse.
+_registered = set()
+
+
+def map_key(colors):
+    # The map itself, not its hash: maps whose hashes collide must not share
+    # an index
+    return tuple(tuple(row) for row in colors)
+
+
+@metrics.timed
+def build_index(colors):
+    solutions = []
+    for solution in iter_solutions(colors):
+        solutions.append(solution)
+        if len(solutions) > MAX_SOLUTIONS:
+            return None
+    return SolutionIndex([list(row) for row in colors], solutions)
+
+
+def register(colors):
+    _registered.add(map_key(colors))
+
+
+def is_registered(colors):
+    return map_key(colors) in _registered
+
+
+for _colors in predefined_colors.values():
+    register(_colors)
+
+
+def lookup_index(colors):
+    # (True, index) if the map was already indexed; index is None for maps
+    # that have too many solutions to index
+    key = map_key(colors)
+    with _lock:
+        if key in _indexes:
+            _indexes.move_to_end(key)
+            return True, _indexes[key]
+    index = _generated.get(key)
+    if index is not None:
+        return True, index
+    return False, None
+
+
+def store_index(colors, index):
+    with _lock:
+        _indexes[map_key(colors)] = index
+        if len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+
+
+def store_generated(colors, solution):
+    # For maps made by the queens generator, whose solution is unique
+    _generated.set(map_key(colors), SolutionIndex([list(row) for row in colors], [solution]))
+
+
+def stats():
+    return {"indexes": len(_indexes), "registered": len(_registered), "generated": _generated.stats()}
+
+
+def get_index(colors):
+    found, index = lookup_index(colors)
+    if not found:
+        index = build_index(colors)
+        store_index(colors, index)
+    return index
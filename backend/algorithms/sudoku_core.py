@@ -0,0 +1,221 @@
+import random
+
+# Boards are flat lists of 81 ints (0 = empty). Digit d is stored as bit 1 << d
+# in the row, column and box masks, so every placement check is O(1).
+ALL_DIGITS = 0b1111111110
+
+ROW = [i // 9 for i in range(81)]
+COL = [i % 9 for i in range(81)]
+BOX = [(i // 27) * 3 + (i % 9) // 3 for i in range(81)]
+
+UNITS = (
+    [[r * 9 + c for c in range(9)] for r in range(9)]
+    + [[r * 9 + c for r in range(9)] for c in range(9)]
+    + [[i for i in range(81) if BOX[i] == b] for b in range(9)]
+)
+PEERS = [sorted(set(j for u in (ROW[i], 9 + COL[i], 18 + BOX[i]) for j in UNITS[u]) - {i}) for i in range(81)]
+DIGITS = [[d for d in range(1, 10) if (mask >> d) & 1] for mask in range(1 << 10)]
+
+
+def flatten(board):
+    return [value for row in board for value in row]
+
+
+def to_grid(cells):
+    return [list(cells[r * 9:r * 9 + 9]) for r in range(9)]
+
+
+# Compact storage form: 81 ASCII digits, e.g. "530070000600195000..."
+def encode(board):
+    cells = flatten(board) if board and isinstance(board[0], list) else board
+    return bytes(d + 48 for d in cells).decode("ascii")
+
+
+def decode(text):
+    if len(text) != 81 or not (text.isascii() and text.isdigit()):
+        raise ValueError("a compact Sudoku board is a string of 81 digits")
+    return [b - 48 for b in text.encode("ascii")]
+
+
+def as_cells(board):
+    # Accepts the compact string, a flat list or a 9x9 grid
+    if isinstance(board, str):
+        return decode(board)
+    if board and isinstance(board[0], list):
+        return flatten(board)
+    return list(board)
+
+
+def parse_board(board):
+    # as_cells for boards sent by clients: anything but 81 digits from 0 to 9,
+    # as a 9x9 grid or the compact string, is a ValueError
+    if isinstance(board, list) and (len(board) != 9 or any(not isinstance(row, list) or len(row) != 9 for row in board)):
+        raise ValueError("a Sudoku board is a 9x9 grid")
+    cells = as_cells(board)
+    if any(not 0 <= d <= 9 for d in cells):
+        raise ValueError("Sudoku cells hold digits from 0 to 9")
+    return cells
+
+
+class Grid:
+    __slots__ = ("cells", "rows", "cols", "boxes", "conflicts")
+
+    def __init__(self, cells):
+        self.cells = list(cells)
+        self.rows = [0] * 9
+        self.cols = [0] * 9
+        self.boxes = [0] * 9
+        # Number of placements that repeat a digit already in one of their units
+        self.conflicts = 0
+        for i, d in enumerate(self.cells):
+            if d:
+                if not 1 <= d <= 9:
+                    self.conflicts += 1
+                    continue
+                if not self.can_place(i, d):
+                    self.conflicts += 1
+                self._mark(i, d)
+
+    def _mark(self, i, d):
+        bit = 1 << d
+        self.rows[ROW[i]] |= bit
+        self.cols[COL[i]] |= bit
+        self.boxes[BOX[i]] |= bit
+
+    def candidates(self, i):
+        return ALL_DIGITS & ~(self.rows[ROW[i]] | self.cols[COL[i]] | self.boxes[BOX[i]])
+
+    def can_place(self, i, d):
+        return not ((self.rows[ROW[i]] | self.cols[COL[i]] | self.boxes[BOX[i]]) >> d) & 1
+
+    def place(self, i, d):
+        self.cells[i] = d
+        self._mark(i, d)
+
+    def remove(self, i):
+        bit = ~(1 << self.cells[i])
+        self.cells[i] = 0
+        self.rows[ROW[i]] &= bit
+        self.cols[COL[i]] &= bit
+        self.boxes[BOX[i]] &= bit
+
+    def is_valid(self):
+        return self.conflicts == 0
+
+    def next_empty(self):
+        # Empty cell with the fewest candidates, or -1 when the grid is full
+        best, best_count = -1, 10
+        for i in range(81):
+            if not self.cells[i]:
+                count = self.candidates(i).bit_count()
+                if count < best_count:
+                    best, best_count = i, count
+                    if count <= 1:
+                        break
+        return best
+
+
+def is_valid(cells):
+    rows = [0] * 9
+    cols = [0] * 9
+    boxes = [0] * 9
+    for i, d in enumerate(cells):
+        if not d:
+            continue
+        if not 1 <= d <= 9:
+            return False
+        bit = 1 << d
+        r, c, b = ROW[i], COL[i], BOX[i]
+        if (rows[r] | cols[c] | boxes[b]) & bit:
+            return False
+        rows[r] |= bit
+        cols[c] |= bit
+        boxes[b] |= bit
+    return True
+
+
+def solve(cells, shuffle=False):
+    # Minimum-remaining-values backtracking; returns the solved cells or None
+    grid = Grid(cells)
+    if not grid.is_valid():
+        return None
+
+    def search():
+        i = grid.next_empty()
+        if i == -1:
+            return True
+        digits = DIGITS[grid.candidates(i)]
+        if shuffle:
+            digits = random.sample(digits, len(digits))
+        for d in digits:
+            grid.place(i, d)
+            if search():
+                return True
+            grid.remove(i)
+        return False
+
+    return grid.cells if search() else None
+
+
+def count_solutions(cells, limit=2):
+    # Stops as soon as `limit` solutions are found
+    grid = Grid(cells)
+    if not grid.is_valid():
+        return 0
+    count = 0
+
+    def search():
+        nonlocal count
+        i = grid.next_empty()
+        if i == -1:
+            count += 1
+            return count >= limit
+        for d in DIGITS[grid.candidates(i)]:
+            grid.place(i, d)
+            if search():
+                return True
+            grid.remove(i)
+        return False
+
+    search()
+    return count
+
+
+def difficulty_score(cells):
+    # Rounds of constraint propagation needed to solve the puzzle. A round of
+    # naked singles costs 1, a round that needs hidden singles costs 3 and
+    # every cell left for guessing costs 10.
+    grid = Grid(cells)
+    score = 0
+    while True:
+        empty = [i for i in range(81) if not grid.cells[i]]
+        if not empty:
+            return score
+
+        singles = {}
+        for i in empty:
+            mask = grid.candidates(i)
+            if mask and not mask & (mask - 1):
+                singles[i] = mask.bit_length() - 1
+        if singles:
+            score += 1
+        else:
+            for unit in UNITS:
+                seen_once = 0
+                seen_twice = 0
+                for i in unit:
+                    if not grid.cells[i]:
+                        mask = grid.candidates(i)
+                        seen_twice |= seen_once & mask
+                        seen_once |= mask
+                only = seen_once & ~seen_twice
+                for i in unit:
+                    if not grid.cells[i] and grid.candidates(i) & only:
+                        singles[i] = (grid.candidates(i) & only).bit_length() - 1
+            if not singles:
+                return score + 10 * len(empty)
+            score += 3
+
+        for i, d in singles.items():
+            if grid.can_place(i, d):
+                grid.place(i, d)
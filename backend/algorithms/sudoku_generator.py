@@ -1,50 +1,62 @@
 import random
-import copy
+from algorithms.sudoku_core import solve, to_grid, flatten, count_solutions, difficulty_score
+import metrics
 
+# Target clue count and accepted propagation-score range for each difficulty
+DIFFICULTY_TARGETS = {
+    "easy": {"clues": 38, "min_score": 0, "max_score": 9},
+    "medium": {"clues": 32, "min_score": 8, "max_score": 40},
+    "hard": {"clues": 26, "min_score": 20, "max_score": None},
+}
+MAX_CARVE_ATTEMPTS = 5
+
+@metrics.timed
 def generate_full_board():
-    board = [[0] * 9 for _ in range(9)]
+    # Random digit order with minimum-remaining-values cell selection
+    return to_grid(solve([0] * 81, shuffle=True))
 
-    def is_valid(num, row, col):
-        for i in range(9):
-            if board[row][i] == num or board[i][col] == num:
-                return False
-        start_row, start_col = 3 * (row // 3), 3 * (col // 3)
-        for i in range(3):
-            for j in range(3):
-                if board[start_row + i][start_col + j] == num:
-                    return False
-        return True
+def carve(cells, clues):
+    # Blank cells in random order, keeping each removal only if the puzzle
+    # still has exactly one solution
+    puzzle = list(cells)
+    filled = 81
+    order = random.sample(range(81), 81)
+    for i in order:
+        if filled <= clues:
+            break
+        value = puzzle[i]
+        puzzle[i] = 0
+        if count_solutions(puzzle, limit=2) == 1:
+            filled -= 1
+        else:
+            puzzle[i] = value
+    return puzzle
 
-    def fill():
-        for row in range(9):
-            for col in range(9):
-                if board[row][col] == 0:
-                    random.shuffle(nums)
-                    for num in nums:
-                        if is_valid(num, row, col):
-                            board[row][col] = num
-                            if fill():
-                                return True
-                            board[row][col] = 0
-                    return False
-        return True
+def in_range(score, target):
+    if score < target["min_score"]:
+        return False
+    return target["max_score"] is None or score <= target["max_score"]
 
-    nums = list(range(1, 10))
-    fill()
-    return board
+@metrics.timed
+def remove_numbers(board, difficulty="medium"):
+    target = DIFFICULTY_TARGETS[difficulty]
+    cells = flatten(board)
 
-def remove_numbers(board, difficulty=40):
-    puzzle = copy.deepcopy(board)
-    attempts = difficulty
-    while attempts > 0:
-        row, col = random.randint(0, 8), random.randint(0, 8)
-        while puzzle[row][col] == 0:
-            row, col = random.randint(0, 8), random.randint(0, 8)
-        puzzle[row][col] = 0
-        attempts -= 1
-    return puzzle
+    # Retry a few carvings to land in the difficulty's score range, keeping
+    # the closest one if none does
+    best, best_distance = None, None
+    for _ in range(MAX_CARVE_ATTEMPTS):
+        puzzle = carve(cells, target["clues"])
+        score = difficulty_score(puzzle)
+        if in_range(score, target):
+            return to_grid(puzzle)
+        distance = target["min_score"] - score if score < target["min_score"] else score - target["max_score"]
+        if best is None or distance < best_distance:
+            best, best_distance = puzzle, distance
+    return to_grid(best)
 
-def generate_sudoku_puzzle():
+@metrics.timed
+def generate_sudoku_puzzle(difficulty="medium"):
     full = generate_full_board()
-    puzzle = remove_numbers(full)
+    puzzle = remove_numbers(full, difficulty)
     return puzzle, full
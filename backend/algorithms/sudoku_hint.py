@@ -1,42 +1,51 @@
-import logging
-
-# Set up logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+from algorithms import trace
+from algorithms.sudoku_core import Grid, as_cells
+import metrics
 
 # Define the is_valid_move function
+# board is a 9x9 grid, or a Grid whose masks answer in a single test
 def is_valid_move(board, row, col, num):
+    if isinstance(board, Grid):
+        return board.can_place(row * 9 + col, num)
+
     # Check the row and column for duplicates
     for i in range(9):
         if board[row][i] == num or board[i][col] == num:
             return False
-    
+
     # Check the 3x3 subgrid for duplicates
     start_row, start_col = 3 * (row // 3), 3 * (col // 3)
     for i in range(3):
         for j in range(3):
             if board[start_row + i][start_col + j] == num:
                 return False
-    
-    # If no conflicts, the move is valid
     return True
 
-# The get_sudoku_hint function with logging and valid move checks
+# The get_sudoku_hint function with tracing and valid move checks
+# board and solution may be 9x9 grids, flat lists or compact strings
+@metrics.timed
 def get_sudoku_hint(board, solution):
+    tracing = trace.enabled(__name__)
+    board = as_cells(board)
+    solution = as_cells(solution)
+    grid = Grid(board)
+
     # Step 1: Look for the next empty cell and suggest the correct value
     for row in range(9):
         for col in range(9):
+            i = row * 9 + col
             # Skip cells that are already filled and correct
-            if board[row][col] != 0 and board[row][col] == solution[row][col]:
+            if board[i] != 0 and board[i] == solution[i]:
                 continue  # This cell is already correctly filled, so skip it
 
             # Check if the cell is empty (value is 0) and suggest the correct value
-            if board[row][col] == 0:
-                correct_value = solution[row][col]
+            if board[i] == 0:
+                correct_value = solution[i]
                 
                 # Check if the correct value is a valid move
-                if is_valid_move(board, row, col, correct_value):
-                    logger.info(f"Suggested hint: Try placing {correct_value} at ({row}, {col})")
+                if grid.can_place(i, correct_value):
+                    if tracing:
+                        trace.record(__name__, "next_move", row=row, col=col, value=correct_value)
                     return {
                         "hint_type": "next_move",
                         "row": row,
@@ -45,25 +54,29 @@ def get_sudoku_hint(board, solution):
                         "message": f"Try placing {correct_value} at ({row}, {col})"
                     }
                 else:
-                    logger.warning(f"Correct value {correct_value} is not valid at ({row}, {col}) — possible earlier mistake")
+                    if tracing:
+                        trace.record(__name__, "blocked", row=row, col=col, value=correct_value)
                     break  # Stop checking further cells, go to Step 2
 
     # Step 2: Look for wrongly placed cells
     for row in range(9):
         for col in range(9):
-            user_val = board[row][col]
-            if user_val != 0 and user_val != solution[row][col]:
-                logger.warning(f"Incorrect value at ({row},{col}): user has {user_val}, expected {solution[row][col]}")
+            i = row * 9 + col
+            user_val = board[i]
+            if user_val != 0 and user_val != solution[i]:
+                if tracing:
+                    trace.record(__name__, "wrong_cell", row=row, col=col, value=user_val, expected=solution[i])
                 return {
                     "hint_type": "wrong_cell",
                     "row": row,
                     "col": col,
                     "user_value": user_val,
-                    "correct_value": solution[row][col],
-                    "message": f"Incorrect value at ({row}, {col}): You have {user_val}, should be {solution[row][col]}"
+                    "correct_value": solution[i],
+                    "message": f"Incorrect value at ({row}, {col}): You have {user_val}, should be {solution[i]}"
                 }
 
-    logger.info("No hints found: the puzzle might be solved or empty.")
+    if tracing:
+        trace.record(__name__, "solved_or_empty")
     return {
         "hint_type": "solved_or_empty",
         "message": "No hints available. Puzzle may be solved or empty."
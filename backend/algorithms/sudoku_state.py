@@ -0,0 +1,133 @@
+from algorithms.sudoku_core import ROW, COL, BOX, PEERS, as_cells
+
+ALL_CELLS = (1 << 81) - 1
+ROW_CELLS = (1 << 9) - 1
+
+
+def lowest(mask):
+    return (mask & -mask).bit_length() - 1
+
+
+class SudokuState:
+    # A player's Sudoku board updated one cell at a time. Each row, column
+    # and box counts its digits, with a bitmask of the digits present, and
+    # the empty and wrong cells are kept as 81-bit masks, so a move and the
+    # validity check are O(1) and a hint looks at nine row slices at most.
+    def __init__(self, puzzle, solution, board=None):
+        self.puzzle = as_cells(puzzle)
+        self.solution = as_cells(solution)
+        self.cells = [0] * 81
+        # counts[unit][d]; units 0-8 are rows, 9-17 columns, 18-26 boxes
+        self.counts = [[0] * 10 for _ in range(27)]
+        self.masks = [0] * 27
+        # Placements beyond the first of a digit in a unit
+        self.duplicates = 0
+        self.empty = ALL_CELLS
+        self.wrong = 0
+
+        cells = as_cells(board) if board is not None else self.puzzle
+        if len(cells) != 81 or any(not 0 <= d <= 9 for d in cells):
+            raise ValueError("board must hold 81 digits from 0 to 9")
+        for i, d in enumerate(cells):
+            if d:
+                self._place(i, d)
+
+    def _units(self, i):
+        return ROW[i], 9 + COL[i], 18 + BOX[i]
+
+    def _place(self, i, d):
+        for unit in self._units(i):
+            count = self.counts[unit][d]
+            if count:
+                self.duplicates += 1
+            self.counts[unit][d] = count + 1
+            self.masks[unit] |= 1 << d
+        self.cells[i] = d
+        self.empty &= ~(1 << i)
+        if d != self.solution[i]:
+            self.wrong |= 1 << i
+
+    def _clear(self, i):
+        d = self.cells[i]
+        for unit in self._units(i):
+            count = self.counts[unit][d] - 1
+            if count:
+                self.duplicates -= 1
+            else:
+                self.masks[unit] &= ~(1 << d)
+            self.counts[unit][d] = count
+        self.cells[i] = 0
+        self.empty |= 1 << i
+        self.wrong &= ~(1 << i)
+
+    def set(self, row, col, value):
+        # value 0 clears the cell; the puzzle's clues can't be changed
+        if not (0 <= row < 9 and 0 <= col < 9 and 0 <= value <= 9):
+            raise ValueError(f"Invalid move ({row}, {col}) = {value}")
+        i = row * 9 + col
+        if self.puzzle[i]:
+            raise ValueError(f"({row}, {col}) is part of the puzzle")
+        if self.cells[i]:
+            self._clear(i)
+        if value:
+            self._place(i, value)
+
+    def conflicts(self, row, col):
+        # Cells sharing a unit and a digit with (row, col)
+        i = row * 9 + col
+        d = self.cells[i]
+        if not d:
+            return []
+        return [(ROW[j], COL[j]) for j in PEERS[i] if self.cells[j] == d]
+
+    def can_place(self, i, d):
+        return not ((self.masks[ROW[i]] | self.masks[9 + COL[i]] | self.masks[18 + BOX[i]]) >> d) & 1
+
+    @property
+    def valid(self):
+        return self.duplicates == 0
+
+    @property
+    def remaining(self):
+        return self.empty.bit_count()
+
+    @property
+    def complete(self):
+        return not self.empty and not self.wrong
+
+    def hint(self):
+        # Same answers as sudoku_hint.get_sudoku_hint: the first empty cell
+        # of each row is that row's candidate
+        for row in range(9):
+            empty = (self.empty >> (row * 9)) & ROW_CELLS
+            if not empty:
+                continue
+            col = lowest(empty)
+            i = row * 9 + col
+            value = self.solution[i]
+            if self.can_place(i, value):
+                return {
+                    "hint_type": "next_move",
+                    "row": row,
+                    "col": col,
+                    "value": value,
+                    "message": f"Try placing {value} at ({row}, {col})"
+                }
+
+        if self.wrong:
+            i = lowest(self.wrong)
+            row, col = ROW[i], COL[i]
+            user_val, correct = self.cells[i], self.solution[i]
+            return {
+                "hint_type": "wrong_cell",
+                "row": row,
+                "col": col,
+                "user_value": user_val,
+                "correct_value": correct,
+                "message": f"Incorrect value at ({row}, {col}): You have {user_val}, should be {correct}"
+            }
+
+        return {
+            "hint_type": "solved_or_empty",
+            "message": "No hints available. Puzzle may be solved or empty."
+        }
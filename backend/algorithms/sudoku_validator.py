@@ -1,24 +1,8 @@
-def is_valid_sudoku(board):
-    def is_valid_group(group):
-        nums = [n for n in group if n != 0]
-        return len(nums) == len(set(nums))
-
-    for row in board:
-        if not is_valid_group(row):
-            return False
+from algorithms.sudoku_core import as_cells, is_valid
+import metrics
 
-    for col in zip(*board):
-        if not is_valid_group(col):
-            return False
 
-    for i in range(0, 9, 3):
-        for j in range(0, 9, 3):
-            block = [
-                board[x][y]
-                for x in range(i, i + 3)
-                for y in range(j, j + 3)
-            ]
-            if not is_valid_group(block):
-                return False
-
-    return True
+# board may be a 9x9 grid, a flat list or a compact string
+@metrics.timed
+def is_valid_sudoku(board):
+    return is_valid(as_cells(board))
@@ -0,0 +1,111 @@
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+
+# ALGO_TRACE is a comma separated list of module names (e.g.
+# "algorithms.dp_validator") or "*" to trace every module.
+TRACE_BUFFER_SIZE = int(os.getenv("ALGO_TRACE_BUFFER", "2048"))
+
+_buffer = deque(maxlen=TRACE_BUFFER_SIZE)
+_modules = set(name.strip() for name in os.getenv("ALGO_TRACE", "").split(",") if name.strip())
+_request_id = ContextVar("algo_trace_request", default=None)
+# (modules, events) while running a task on behalf of another process or
+# thread; events are handed back to the caller instead of the buffer
+_task = ContextVar("algo_trace_task", default=None)
+_active_requests = 0
+_lock = Lock()
+
+
+def enabled(module):
+    # Fast path: nothing is being traced anywhere
+    if not _modules and not _active_requests:
+        return False
+    if _request_id.get() is not None:
+        return True
+    task = _task.get()
+    modules = task[0] if task else _modules
+    return "*" in modules or module in modules
+
+
+def record(module, event, **fields):
+    task = _task.get()
+    (task[1] if task else _buffer).append({
+        "ts": time.time(),
+        "request_id": _request_id.get(),
+        "module": module,
+        "event": event,
+        **fields,
+    })
+
+
+def enable(module="*"):
+    _modules.add(module)
+
+
+def disable(module=None):
+    if module is None:
+        _modules.clear()
+    else:
+        _modules.discard(module)
+
+
+@contextmanager
+def tracing(request_id):
+    # Trace every module for the duration of one request
+    global _active_requests
+    token = _request_id.set(request_id)
+    with _lock:
+        _active_requests += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _active_requests -= 1
+        _request_id.reset(token)
+
+
+def context():
+    # What an executor worker needs to trace like the caller; None when the
+    # caller isn't traced, which is the common case
+    if not _modules and not _active_requests:
+        return None
+    request_id = _request_id.get()
+    if request_id is None and not _modules:
+        return None
+    return request_id, tuple(_modules)
+
+
+@contextmanager
+def collect(context):
+    # Worker side of context(): traces like the caller did and yields the
+    # list the events are recorded into
+    global _active_requests
+    request_id, modules = context
+    events = []
+    request_token = _request_id.set(request_id)
+    task_token = _task.set((set(modules), events))
+    with _lock:
+        _active_requests += 1
+    try:
+        yield events
+    finally:
+        with _lock:
+            _active_requests -= 1
+        _task.reset(task_token)
+        _request_id.reset(request_token)
+
+
+def extend(events):
+    _buffer.extend(events)
+
+
+def dump(request_id=None, clear=False):
+    entries = list(_buffer)
+    if request_id is not None:
+        entries = [entry for entry in entries if entry["request_id"] == request_id]
+    if clear:
+        _buffer.clear()
+    return entries
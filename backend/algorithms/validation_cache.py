@@ -0,0 +1,102 @@
+import os
+from collections import OrderedDict
+from itertools import count
+from threading import Lock
+from colors import predefined_colors
+from ttl_cache import TTLCache
+from algorithms.dp_validator import is_valid_board
+import metrics
+
+VALIDATION_CACHE_SIZE = int(os.getenv("VALIDATION_CACHE_SIZE", "4096"))
+VALIDATION_CACHE_TTL = float(os.getenv("VALIDATION_CACHE_TTL", "3600"))
+# Unpinned maps (e.g. generated ones) kept registered at once
+VALIDATION_MAX_MAPS = int(os.getenv("VALIDATION_MAX_MAPS", "4096"))
+
+cache = TTLCache(maxsize=VALIDATION_CACHE_SIZE, ttl=VALIDATION_CACHE_TTL)
+
+# Only boards for known color maps are cached; each map gets a small id.
+# Pinned maps (predefined and room maps) stay registered; the rest are
+# dropped least recently used first. Ids are never reused, so the cached
+# verdicts of a dropped map can't be read for another one and simply age
+# out of the cache.
+_pinned_maps = {}
+_canonical_maps = OrderedDict()
+_map_ids = count()
+_maps_lock = Lock()
+bypassed = 0
+
+
+def register_map(colors, pinned=True):
+    key = tuple(tuple(row) for row in colors)
+    with _maps_lock:
+        map_id = _pinned_maps.get(key)
+        if map_id is None:
+            map_id = _canonical_maps.get(key)
+        if map_id is None:
+            map_id = next(_map_ids)
+        if pinned:
+            _canonical_maps.pop(key, None)
+            _pinned_maps[key] = map_id
+        elif key not in _pinned_maps:
+            _canonical_maps[key] = map_id
+            _canonical_maps.move_to_end(key)
+            while len(_canonical_maps) > VALIDATION_MAX_MAPS:
+                _canonical_maps.popitem(last=False)
+    return map_id
+
+
+for _colors in predefined_colors.values():
+    register_map(_colors)
+
+
+def pack_board(board):
+    # Each cell stores col + 1 so empty rows (-1) pack as 0
+    bits = len(board).bit_length()
+    packed = 0
+    for col in reversed(board):
+        packed = (packed << bits) | (col + 1)
+    return packed
+
+
+def map_id_for(colors):
+    key = tuple(tuple(row) for row in colors)
+    map_id = _pinned_maps.get(key)
+    if map_id is None:
+        with _maps_lock:
+            map_id = _canonical_maps.get(key)
+            if map_id is not None:
+                _canonical_maps.move_to_end(key)
+    return map_id
+
+
+def _is_valid(board, colors, map_id):
+    global bypassed
+    n = len(colors)
+    if map_id is None or len(board) != n or any(not -1 <= col < n for col in board):
+        bypassed += 1
+        return is_valid_board(board, colors)
+
+    key = (map_id, pack_board(board))
+    valid = cache.get(key)
+    if valid is None:
+        valid = is_valid_board(board, colors)
+        cache.set(key, valid)
+    return valid
+
+
+@metrics.timed
+def is_valid(board, colors, map_id=None):
+    # Callers that registered the map already can pass its id
+    return _is_valid(board, colors, map_id if map_id is not None else map_id_for(colors))
+
+
+@metrics.timed
+def is_valid_many(boards, colors, map_id=None):
+    # The color map is fingerprinted once for the whole batch
+    if map_id is None:
+        map_id = map_id_for(colors)
+    return [_is_valid(board, colors, map_id) for board in boards]
+
+
+def stats():
+    return {**cache.stats(), "bypassed": bypassed, "maps": len(_pinned_maps) + len(_canonical_maps)}
@@ -0,0 +1,92 @@
+# End-to-end route benchmarks. Requests go through the full FastAPI stack
+# (middleware, auth, routing, JSON) against the in-memory store.
+import os
+
+os.environ.setdefault("DATA_BACKEND", "memory")
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("ALGO_EXECUTOR", "thread")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+# No background generation competing with the timed requests
+os.environ.setdefault("SUDOKU_POOL_WORKERS", "0")
+os.environ.setdefault("QUEENS_POOL_WORKERS", "0")
+
+from contextlib import contextmanager
+from fastapi.testclient import TestClient
+import main
+from store import get_store
+from routes.auth_routes import create_access_token
+
+PLAYERS = 200
+PASSWORD = "benchmark"
+
+
+def auth(email):
+    return {"Authorization": "Bearer " + create_access_token({"sub": email})}
+
+
+def seed_players(client, count):
+    # Finished sessions so the dashboard has something to rank
+    store = get_store()
+    for i in range(count):
+        user_id = f"player{i}@example.com"
+        client.portal.call(store.create_user, {"username": f"player{i}", "email": user_id, "password": ""})
+        client.portal.call(store.ensure_session, user_id)
+        client.portal.call(store.start_puzzle, user_id, 1)
+        client.portal.call(store.finish_puzzle, user_id, 1)
+
+
+def check(response):
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.request.url}: {response.status_code} {response.text}")
+    return response
+
+
+@contextmanager
+def cases():
+    with TestClient(main.app) as client:
+        email = "bench@example.com"
+        check(client.post("/auth/register", json={"username": "bench", "email": email, "password": PASSWORD}))
+        headers = auth(email)
+        seed_players(client, PLAYERS)
+
+        game = check(client.post("/game/generate", json={"room_id": "room1"}, headers=headers)).json()
+        colors = game["colors"]
+        solution = check(client.post("/game/solve", json={"room_id": "room1", "board": [-1] * game["size"],
+                                                          "colors": colors}, headers=headers)).json()["solution"]
+        half = solution[:len(solution) // 2] + [-1] * (len(solution) - len(solution) // 2)
+        sudoku = check(client.post("/game/sudoku/generate", headers=headers)).json()["board"]
+        etag = check(client.get("/game/dashboard", headers=headers)).headers["ETag"]
+
+        def post(path, body=None):
+            return lambda: check(client.post(path, json=body, headers=headers))
+
+        def get(path, extra=None):
+            return lambda: check(client.get(path, headers={**headers, **(extra or {})}))
+
+        found = {
+            "POST /auth/login": post("/auth/login", {"email": email, "password": PASSWORD}),
+            "POST /game/generate": post("/game/generate", {"room_id": "room1"}),
+            "POST /game/validate": post("/game/validate", {"room_id": "room1", "board": solution, "colors": colors}),
+            "POST /game/hint": post("/game/hint", {"room_id": "room1", "board": half, "colors": colors}),
+            "POST /game/batch/validate[100]": post("/game/batch/validate", {"room_id": "room1", "colors": colors,
+                                                                           "boards": [solution] * 100}),
+            "POST /game/sudoku/validate": post("/game/sudoku/validate", {"board": sudoku}),
+            "POST /game/sudoku/hint": post("/game/sudoku/hint", {"board": sudoku}),
+            "GET /game/dashboard": get("/game/dashboard"),
+            "GET /game/dashboard[304]": get("/game/dashboard", {"If-None-Match": etag}),
+            "POST /game/dashboard/me": post("/game/dashboard/me"),
+        }
+
+        token = headers["Authorization"].split()[1]
+        with client.websocket_connect(f"/game/stream?token={token}") as ws:
+            ws.send_json({"type": "init", "colors": colors})
+            ws.receive_json()
+
+            def move():
+                ws.send_json({"type": "place", "row": 0, "col": solution[0]})
+                ws.receive_json()
+                ws.send_json({"type": "remove", "row": 0})
+                ws.receive_json()
+
+            found["WS /game/stream place+remove"] = move
+            yield found
@@ -0,0 +1,32 @@
+# Boards per second: NumPy batch evaluation against the per-board validator.
+# Run from backend/: python -m benchmarks.bench_batch_eval
+import time
+from algorithms import batch_eval
+from algorithms.dp_validator import is_valid_board, conflicting_rows
+from colors import predefined_colors
+
+
+def bench(colors):
+    # Permutation boards never fail on a column, so the per-board loop
+    # can't return early as often as it does on random boards
+    boards = batch_eval.permutation_boards(len(colors))
+    rows = boards.tolist()
+
+    start = time.perf_counter()
+    valid, _ = batch_eval.evaluate(boards, colors)
+    batch = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for board in rows:
+        is_valid_board(board, colors)
+        conflicting_rows(board, colors)
+    loop = time.perf_counter() - start
+    return {"boards": len(rows), "solutions": int(valid.sum()), "batch_s": batch, "loop_s": loop}
+
+
+if __name__ == "__main__":
+    for n, colors in predefined_colors.items():
+        result = bench(colors)
+        print(f"{n}x{n}: {result['boards']} boards, {result['solutions']} solutions, "
+              f"batch {result['boards'] / result['batch_s']:.0f}/s, "
+              f"per-board {result['boards'] / result['loop_s']:.0f}/s")
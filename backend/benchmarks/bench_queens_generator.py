@@ -0,0 +1,37 @@
+# Unique-solution N-Queens maps per second, on one core and in batch mode.
+# Run from backend/: python -m benchmarks.bench_queens_generator [seconds] [workers]
+import os
+import sys
+import time
+from algorithms.queens_generator import generate_queens_map, generate_maps, SIZES
+from algorithms.bitmask_solver import count_solutions
+
+
+def bench(size, seconds):
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        colors, _ = generate_queens_map(size)
+        count += 1
+    elapsed = time.perf_counter() - start
+    # Uniqueness is checked outside the timed section
+    unique = count_solutions(colors, limit=2) == 1
+    return {"maps_per_sec": count / elapsed, "unique_checked": unique}
+
+
+def bench_batch(size, count, workers):
+    start = time.perf_counter()
+    generate_maps(size, count, workers)
+    return count / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 2
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    for size in SIZES:
+        result = bench(size, seconds)
+        print(f"{size:>2}x{size:<2}: {result['maps_per_sec']:.1f} maps/s per core, "
+              f"last map unique: {result['unique_checked']}")
+    if workers > 1:
+        rate = bench_batch(8, 400, workers)
+        print(f"batch 8x8 on {workers} workers: {rate:.1f} maps/s ({rate / workers:.1f} per worker)")
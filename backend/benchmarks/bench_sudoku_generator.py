@@ -0,0 +1,32 @@
+# Puzzles per second for each Sudoku difficulty.
+# Run from backend/: python -m benchmarks.bench_sudoku_generator [count]
+import sys
+import time
+from algorithms.sudoku_core import flatten, count_solutions, difficulty_score
+from algorithms.sudoku_generator import generate_sudoku_puzzle, DIFFICULTY_TARGETS
+
+
+def bench(difficulty, count):
+    start = time.perf_counter()
+    puzzles = [flatten(generate_sudoku_puzzle(difficulty)[0]) for _ in range(count)]
+    elapsed = time.perf_counter() - start
+
+    # Clues, scores and uniqueness are measured outside the timed section
+    clues = [sum(1 for value in cells if value) for cells in puzzles]
+    scores = [difficulty_score(cells) for cells in puzzles]
+    unique = sum(1 for cells in puzzles[:20] if count_solutions(cells) == 1)
+    return {
+        "puzzles_per_sec": count / elapsed,
+        "avg_clues": sum(clues) / count,
+        "avg_score": sum(scores) / count,
+        "unique_checked": unique,
+    }
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    for difficulty in DIFFICULTY_TARGETS:
+        result = bench(difficulty, count)
+        print(f"{difficulty:>6}: {result['puzzles_per_sec']:.1f} puzzles/s, "
+              f"{result['avg_clues']:.1f} clues, score {result['avg_score']:.1f}, "
+              f"{result['unique_checked']} unique of {min(count, 20)} checked")
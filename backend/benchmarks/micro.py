@@ -0,0 +1,62 @@
+# Microbenchmark cases for the algorithms package. Inputs are built with a
+# fixed seed outside the timed call so runs are comparable.
+import random
+from colors import predefined_colors
+from algorithms.bitmask_solver import solve_n_queens
+from algorithms.dp_validator import is_valid_board
+from algorithms.greedy_hint import get_next_hint
+from algorithms.queens_generator import generate_queens_map
+from algorithms.sudoku_generator import generate_full_board, remove_numbers, DIFFICULTY_TARGETS
+from algorithms.sudoku_validator import is_valid_sudoku
+from algorithms.sudoku_hint import get_sudoku_hint
+
+SEED = 1234
+QUEENS_SIZES = (6, 8, 10, 12)
+# Share of rows or cells filled in from the solution
+FILL_LEVELS = (0.0, 0.5, 1.0)
+
+
+def queens_maps(rng):
+    maps = {size: generate_queens_map(size, rng) for size in QUEENS_SIZES}
+    maps["8-shipped"] = (predefined_colors[8], solve_n_queens(8, predefined_colors[8]))
+    return maps
+
+
+def partial_queens(solution, fill):
+    rows = round(len(solution) * fill)
+    return solution[:rows] + [-1] * (len(solution) - rows)
+
+
+def partial_sudoku(puzzle, solution, fill, rng):
+    # The puzzle with a share of its blanks filled in correctly
+    board = [row[:] for row in puzzle]
+    blanks = [(r, c) for r in range(9) for c in range(9) if not board[r][c]]
+    for r, c in rng.sample(blanks, round(len(blanks) * fill)):
+        board[r][c] = solution[r][c]
+    return board
+
+
+def cases():
+    rng = random.Random(SEED)
+    random.seed(SEED)
+    found = {}
+
+    for name, (colors, solution) in queens_maps(rng).items():
+        n = len(colors)
+        found[f"solve_n_queens[{name}]"] = lambda n=n, colors=colors: solve_n_queens(n, colors)
+        for fill in FILL_LEVELS:
+            board = partial_queens(solution, fill)
+            found[f"is_valid_board[{name},fill={fill}]"] = lambda b=board, colors=colors: is_valid_board(b, colors)
+            found[f"get_next_hint[{name},fill={fill}]"] = lambda b=board, colors=colors: get_next_hint(b, colors)
+
+    found["generate_full_board"] = generate_full_board
+    solution = generate_full_board()
+    for difficulty in DIFFICULTY_TARGETS:
+        found[f"remove_numbers[{difficulty}]"] = lambda d=difficulty: remove_numbers(solution, d)
+
+    puzzle = remove_numbers(solution, "medium")
+    for fill in FILL_LEVELS:
+        board = partial_sudoku(puzzle, solution, fill, rng)
+        found[f"is_valid_sudoku[fill={fill}]"] = lambda b=board: is_valid_sudoku(b)
+        found[f"get_sudoku_hint[fill={fill}]"] = lambda b=board: get_sudoku_hint(b, solution)
+    return found
@@ -0,0 +1,120 @@
+# Benchmark suite with stored baselines.
+# Run from backend/:
+#   python -m benchmarks.suite                 compare against the baselines
+#   python -m benchmarks.suite --save          record new baselines
+#   python -m benchmarks.suite --group micro --filter sudoku
+# Exits with status 1 when a case is slower than its baseline by more than
+# the threshold. Baselines are only comparable on the machine that made them,
+# so baselines.json is local to each checkout and not committed.
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baselines.json")
+THRESHOLD = 0.25
+REPEAT = 5
+MIN_TIME = 0.1
+
+
+def measure(fn, repeat=REPEAT, min_time=MIN_TIME):
+    # Calls per sample grow until one sample takes min_time; reports the
+    # median and best time per call in microseconds
+    fn()
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    samples = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - start) / loops)
+    return {
+        "median_us": round(statistics.median(samples) * 1e6, 2),
+        "best_us": round(min(samples) * 1e6, 2),
+        "loops": loops,
+    }
+
+
+def run_group(cases, pattern, repeat, min_time):
+    results = {}
+    for name, fn in cases.items():
+        if pattern and pattern not in name:
+            continue
+        results[name] = measure(fn, repeat, min_time)
+        print(f"  {name:<48} {results[name]['median_us']:>12.1f} us", flush=True)
+    return results
+
+
+def compare(results, baselines, threshold):
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            continue
+        ratio = result["median_us"] / baseline["median_us"]
+        if ratio > 1 + threshold:
+            regressions.append((name, baseline["median_us"], result["median_us"], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--group", choices=["micro", "api", "all"], default="all")
+    parser.add_argument("--filter", default="")
+    parser.add_argument("--save", action="store_true")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--min-time", type=float, default=MIN_TIME)
+    args = parser.parse_args()
+
+    results = {}
+    if args.group in ("micro", "all"):
+        from benchmarks import micro
+        print("micro")
+        results.update(run_group(micro.cases(), args.filter, args.repeat, args.min_time))
+    if args.group in ("api", "all"):
+        from benchmarks import api
+        print("api")
+        with api.cases() as cases:
+            results.update(run_group(cases, args.filter, args.repeat, args.min_time))
+
+    saved = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            saved = json.load(f)
+
+    if args.save:
+        saved["machine"] = f"{platform.machine()} {platform.python_implementation()} {platform.python_version()}"
+        saved.setdefault("cases", {}).update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(saved, f, indent=2, sort_keys=True)
+        print(f"saved {len(results)} baselines to {args.baseline}")
+        return 0
+
+    if not saved.get("cases"):
+        print(f"no baselines in {args.baseline}; record them with --save")
+        return 0
+
+    regressions = compare(results, saved["cases"], args.threshold)
+    for name, before, after, ratio in regressions:
+        print(f"REGRESSION {name}: {before:.1f} us -> {after:.1f} us ({ratio:.2f}x)")
+    if not regressions:
+        print(f"no regressions beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
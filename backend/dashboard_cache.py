@@ -0,0 +1,136 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+# Snapshots are rebuilt when a puzzle is completed in this process; the max
+# age bounds how stale they get when other workers record completions.
+DASHBOARD_SNAPSHOT_MAX_AGE = float(os.getenv("DASHBOARD_SNAPSHOT_MAX_AGE", "30"))
+DASHBOARD_SNAPSHOT_KEYS = 64
+# Completions within this many seconds share one background refresh
+DASHBOARD_REBUILD_DELAY = float(os.getenv("DASHBOARD_REBUILD_DELAY", "1"))
+
+logger = logging.getLogger(__name__)
+
+
+class Snapshot:
+    __slots__ = ("version", "etag", "body", "built_at")
+
+    def __init__(self, version, body, built_at):
+        self.version = version
+        self.etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        self.body = body
+        self.built_at = built_at
+
+
+class SnapshotCache:
+    def __init__(self, max_age=DASHBOARD_SNAPSHOT_MAX_AGE, max_keys=DASHBOARD_SNAPSHOT_KEYS,
+                 rebuild_delay=DASHBOARD_REBUILD_DELAY):
+        self.max_age = max_age
+        self.max_keys = max_keys
+        self.rebuild_delay = rebuild_delay
+        self.version = 0
+        self._snapshots = OrderedDict()
+        self._builders = {}
+        self._building = {}
+        self._refresh = None
+        self.refreshes = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.rebuilds = 0
+        self.last_rebuild_seconds = None
+
+    def _is_fresh(self, snapshot):
+        return snapshot.version == self.version and time.monotonic() - snapshot.built_at < self.max_age
+
+    async def get(self, key, build):
+        # build is an async callable returning JSON-serialisable data
+        snapshot = self._snapshots.get(key)
+        if snapshot and self._is_fresh(snapshot):
+            self.hits += 1
+            self._snapshots.move_to_end(key)
+            return snapshot
+
+        self.misses += 1
+        self._builders[key] = build
+        return await self._rebuild(key)
+
+    def _build_task(self, key):
+        # One build per key and version, shared by every waiting request
+        version, task = self._building.get(key, (None, None))
+        if task is None or version != self.version:
+            version = self.version
+            task = asyncio.ensure_future(self._build(key, version))
+            self._building[key] = (version, task)
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return task
+
+    async def _rebuild(self, key):
+        return await asyncio.shield(self._build_task(key))
+
+    def _finish(self, key, task):
+        if self._building.get(key, (None, None))[1] is task:
+            del self._building[key]
+        if not task.cancelled() and task.exception():
+            logger.warning("Dashboard snapshot rebuild failed: %s", task.exception())
+
+    async def _build(self, key, version):
+        start = time.perf_counter()
+        data = await self._builders[key]()
+        snapshot = Snapshot(version, json.dumps(data).encode(), time.monotonic())
+        self.rebuilds += 1
+        self.last_rebuild_seconds = time.perf_counter() - start
+
+        # A slow build for an older version must not replace a newer snapshot
+        current = self._snapshots.get(key)
+        if current is not None and current.version > version:
+            return snapshot
+
+        self._snapshots[key] = snapshot
+        self._snapshots.move_to_end(key)
+        while len(self._snapshots) > self.max_keys:
+            old_key, _ = self._snapshots.popitem(last=False)
+            self._builders.pop(old_key, None)
+        return snapshot
+
+    def invalidate(self):
+        # Called on puzzle completion; pages that were served before are
+        # rebuilt in the background so the next poll is a hit. A burst of
+        # completions schedules a single refresh.
+        self.version += 1
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.ensure_future(self._refresh_snapshots())
+
+    async def _refresh_snapshots(self):
+        # One pass over the cached pages at a time; completions recorded
+        # during a pass are picked up by the next one
+        while True:
+            await asyncio.sleep(self.rebuild_delay)
+            version = self.version
+            await asyncio.gather(*(self._build_task(key) for key in list(self._snapshots)),
+                                 return_exceptions=True)
+            self.refreshes += 1
+            if self.version == version:
+                return
+
+    def stats(self):
+        now = time.monotonic()
+        ages = [now - snapshot.built_at for snapshot in self._snapshots.values()]
+        return {
+            "version": self.version,
+            "snapshots": len(self._snapshots),
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "rebuilds": self.rebuilds,
+            "refreshes": self.refreshes,
+            "last_rebuild_seconds": self.last_rebuild_seconds,
+            "max_snapshot_age_seconds": max(ages) if ages else None,
+        }
+
+
+dashboard_snapshots = SnapshotCache()
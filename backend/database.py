@@ -1,4 +1,4 @@
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 import os
 
@@ -6,19 +6,42 @@ load_dotenv()
 
 mongo_url = os.getenv("MONGO_URL")
 
-client = MongoClient(mongo_url)
-db = client["escape_room"]
-game_sessions = db["game_sessions"]
-rooms_collection = db["rooms"]
-users_collection = db["users"]
+# Connection pool and timeout settings
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_MS = int(os.getenv("MONGO_MAX_IDLE_MS", "60000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+# Upper bound for any single operation, including waiting for a pooled connection
+MONGO_OPERATION_TIMEOUT_MS = int(os.getenv("MONGO_OPERATION_TIMEOUT_MS", "5000"))
 
-def init_db():
-    if rooms_collection.count_documents({}) == 0:
-        rooms_collection.insert_many([
-            {"id": "room1", "name": "Room 1", "difficulty": 1, "locked": False, "maze": [], "items": ["key1"]},
-            {"id": "room2", "name": "Room 2", "difficulty": 2, "locked": True, "key_required": "key1", "maze": [], "items": ["key2"]},
-            {"id": "room3", "name": "Room 3", "difficulty": 3, "locked": True, "key_required": "key2", "maze": [], "items": []}
-        ])
+ROOMS = [
+    {"id": "room1", "name": "Room 1", "difficulty": 1, "locked": False, "maze": [], "items": ["key1"],
+     "puzzle": {"type": "nqueens", "size": 8, "generated": True}},
+    {"id": "room2", "name": "Room 2", "difficulty": 2, "locked": True, "key_required": "key1", "maze": [], "items": ["key2"],
+     "puzzle": {"type": "sudoku", "difficulty": "medium"}},
+    {"id": "room3", "name": "Room 3", "difficulty": 3, "locked": True, "key_required": "key2", "maze": [], "items": []}
+]
+
+client = None
 
 def get_db():
-    return db
\ No newline at end of file
+    # The client is created on first use so the in-memory store never connects
+    global client
+    if client is None:
+        client = AsyncIOMotorClient(
+            mongo_url,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGO_MAX_IDLE_MS,
+            connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            timeoutMS=MONGO_OPERATION_TIMEOUT_MS,
+        )
+    return client["escape_room"]
+
+def close_db():
+    global client
+    if client is not None:
+        client.close()
+        client = None
@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 def calculate_duration(start, end):
     if start and end:
         start_time = start if isinstance(start, datetime) else start["$date"]
@@ -6,4 +6,20 @@ def calculate_duration(start, end):
         start_dt = datetime.fromisoformat(str(start_time).replace("Z", "+00:00"))
         end_dt = datetime.fromisoformat(str(end_time).replace("Z", "+00:00"))
         return str(end_dt - start_dt)
-    return None
\ No newline at end of file
+    return None
+
+def parse_total_time(total_time):
+    # Seconds from a numeric total_time or a legacy "H:MM:SS.ffffff" string
+    if isinstance(total_time, (int, float)):
+        return float(total_time)
+    if isinstance(total_time, str):
+        try:
+            hours, minutes, seconds = total_time.split(":")
+            return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+        except ValueError:
+            return None
+    return None
+
+
+def format_duration(seconds):
+    return str(timedelta(seconds=seconds)) if seconds is not None else None
@@ -0,0 +1,162 @@
+# Load generator: virtual players walk the whole escape-room flow.
+# Run from backend/:
+#   python -m loadtest.run --players 1000 --concurrency 200
+#       drives the app in process against the in-memory store
+#   python -m loadtest.run --url http://localhost:8000 --players 1000
+#       drives a running server, e.g. one started with DATA_BACKEND=memory
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+import httpx
+from loadtest.stats import Recorder, format_summary
+
+
+class Player:
+    def __init__(self, client, recorder, args, rng):
+        self.client = client
+        self.recorder = recorder
+        self.args = args
+        self.rng = rng
+        self.headers = {}
+
+    async def think(self):
+        if self.args.think:
+            await asyncio.sleep(self.rng.uniform(0, 2 * self.args.think))
+
+    async def call(self, method, path, body=None):
+        endpoint = f"{method} {path}"
+        for attempt in range(self.args.retries + 1):
+            start = time.perf_counter()
+            try:
+                response = await self.client.request(method, path, json=body, headers=self.headers)
+            except httpx.HTTPError:
+                self.recorder.record(endpoint, time.perf_counter() - start, 0)
+                raise
+            self.recorder.record(endpoint, time.perf_counter() - start, response.status_code)
+            # Back off like a well-behaved client when the server sheds load
+            if response.status_code not in (429, 503) or attempt == self.args.retries:
+                break
+            await asyncio.sleep(float(response.headers.get("Retry-After", "1")) * self.rng.uniform(1, 2))
+        response.raise_for_status()
+        await self.think()
+        return response.json() if response.content else None
+
+    async def login(self):
+        name = f"load-{uuid.uuid4().hex[:12]}"
+        account = {"email": f"{name}@example.com", "password": "load-test"}
+        await self.call("POST", "/auth/register", {"username": name, **account})
+        token = (await self.call("POST", "/auth/login", account))["access_token"]
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    async def n_queens(self):
+        room = {"room_id": "room1"}
+        game = await self.call("POST", "/game/generate", room)
+        colors, board = game["colors"], [-1] * game["size"]
+        await self.call("POST", "/game/start", room)
+
+        # Follow hints, with the occasional full-board validation on the way
+        for _ in range(game["size"]):
+            result = await self.call("POST", "/game/hint", {**room, "board": board, "colors": colors})
+            if not result["hint"]:
+                break
+            row, col = result["hint"]
+            board[row] = col
+            if self.rng.random() < self.args.validate_rate:
+                await self.call("POST", "/game/validate", {**room, "board": board, "colors": colors})
+        await self.call("POST", "/game/validate", {**room, "board": board, "colors": colors})
+        await self.call("POST", "/game/end-timer", room)
+
+    async def sudoku(self):
+        room = {"room_id": "room2"}
+        board = (await self.call("POST", "/game/sudoku/generate", room))["board"]
+        await self.call("POST", "/game/sudoku/start", room)
+
+        for _ in range(self.args.sudoku_hints):
+            hint = await self.call("POST", "/game/sudoku/hint", {**room, "board": board})
+            if hint["hint_type"] != "next_move":
+                break
+            board[hint["row"]][hint["col"]] = hint["value"]
+        await self.call("POST", "/game/sudoku/validate", {**room, "board": board})
+        await self.call("POST", "/game/sudoku/end-timer", room)
+
+    async def run(self):
+        await self.login()
+        await self.n_queens()
+        await self.sudoku()
+        await self.call("GET", "/game/dashboard")
+        await self.call("POST", "/game/dashboard/me")
+
+
+async def play(client, recorder, args, gate, delay, seed):
+    await asyncio.sleep(delay)
+    async with gate:
+        try:
+            await Player(client, recorder, args, random.Random(seed)).run()
+            recorder.players_done += 1
+        except (httpx.HTTPError, KeyError, TypeError, ValueError):
+            recorder.players_failed += 1
+
+
+async def drive(client, args):
+    recorder = Recorder()
+    gate = asyncio.Semaphore(args.concurrency)
+    # Arrivals are spread evenly over the ramp-up period
+    step = args.ramp / args.players if args.players else 0
+    await asyncio.gather(*(play(client, recorder, args, gate, i * step, args.seed + i) for i in range(args.players)))
+    recorder.stop()
+    return recorder.summary()
+
+
+def client_limits(args):
+    return httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+
+async def run_remote(args):
+    async with httpx.AsyncClient(base_url=args.url, limits=client_limits(args), timeout=args.timeout) as client:
+        return await drive(client, args)
+
+
+async def run_in_process(args):
+    # Same app and settings as a real server, minus the network
+    for key, value in (("DATA_BACKEND", "memory"), ("MONGO_URL", "mongodb://localhost:27017"),
+                       ("ALGO_EXECUTOR", "thread")):
+        os.environ.setdefault(key, value)
+    import main
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", limits=client_limits(args),
+                                     timeout=args.timeout) as client:
+            return await drive(client, args)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="server to drive; the app runs in process when omitted")
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=100, help="players active at once")
+    parser.add_argument("--ramp", type=float, default=10, help="seconds over which players arrive")
+    parser.add_argument("--think", type=float, default=0.0, help="mean pause between a player's requests")
+    parser.add_argument("--sudoku-hints", type=int, default=10)
+    parser.add_argument("--validate-rate", type=float, default=0.2)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--retries", type=int, default=5, help="retries after a 429 or 503")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the summary to this file")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run_remote(args) if args.url else run_in_process(args))
+    print(format_summary(summary))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 1 if summary["players_failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
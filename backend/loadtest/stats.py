@@ -0,0 +1,71 @@
+import time
+from collections import defaultdict
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(ordered, p):
+    if not ordered:
+        return None
+    k = (len(ordered) - 1) * p / 100
+    low = int(k)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+
+class Recorder:
+    # Latencies and status codes per endpoint, keyed by "METHOD /path"
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.started = time.perf_counter()
+        self.finished = None
+        self.players_done = 0
+        self.players_failed = 0
+
+    def record(self, endpoint, seconds, status):
+        self.latencies[endpoint].append(seconds)
+        self.statuses[endpoint][status] += 1
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    def summary(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        endpoints = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            ordered = sorted(values)
+            statuses = dict(self.statuses[endpoint])
+            errors = sum(count for status, count in statuses.items() if status == 0 or status >= 400)
+            endpoints[endpoint] = {
+                "requests": len(ordered),
+                "throughput": len(ordered) / elapsed,
+                "error_rate": errors / len(ordered),
+                "statuses": statuses,
+                **{f"p{p}_ms": percentile(ordered, p) * 1000 for p in PERCENTILES},
+                "max_ms": ordered[-1] * 1000,
+            }
+        total = sum(len(values) for values in self.latencies.values())
+        return {
+            "elapsed_s": elapsed,
+            "players": self.players_done,
+            "players_failed": self.players_failed,
+            "requests": total,
+            "throughput": total / elapsed if elapsed else 0,
+            "endpoints": endpoints,
+        }
+
+
+def format_summary(summary):
+    lines = [
+        f"{summary['players']} players ({summary['players_failed']} failed), {summary['requests']} requests "
+        f"in {summary['elapsed_s']:.1f}s, {summary['throughput']:.1f} req/s",
+        f"{'endpoint':<28}{'reqs':>7}{'req/s':>9}{'err%':>7}" + "".join(f"{'p' + str(p):>9}" for p in PERCENTILES)
+        + f"{'max':>9}",
+    ]
+    for endpoint, row in summary["endpoints"].items():
+        lines.append(
+            f"{endpoint:<28}{row['requests']:>7}{row['throughput']:>9.1f}{row['error_rate'] * 100:>7.1f}"
+            + "".join(f"{row[f'p{p}_ms']:>9.1f}" for p in PERCENTILES) + f"{row['max_ms']:>9.1f}"
+        )
+    return "\n".join(lines)
@@ -1,12 +1,36 @@
-from fastapi import FastAPI
+import uuid
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware  # Import CORSMiddleware
 from routes.game_routes import router as game_router
-from routes.auth_routes import router as auth_router
-from database import init_db
+from routes.auth_routes import router as auth_router, request_operator, password_executor
+from routes.stream_routes import router as stream_router
+from routes.metrics_routes import router as metrics_router
+from store import get_store
+from algorithms import trace
+from puzzle_pool import sudoku_pool, queens_pool
+from algorithms.executor import algorithm_executor, ExecutorSaturated, TaskTimeout
+from metrics import MetricsMiddleware, METRICS_ENABLED
+from profiler import profiler
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app):
+    store = get_store()
+    await store.init()
+    algorithm_executor.start()
+    password_executor.start()
+    sudoku_pool.start()
+    queens_pool.start()
+    yield
+    profiler.stop()
+    queens_pool.stop()
+    sudoku_pool.stop()
+    password_executor.shutdown()
+    algorithm_executor.shutdown()
+    await store.close()
 
-init_db()
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost:3000",  
@@ -19,10 +43,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  
     allow_headers=["*"],  
+    expose_headers=["ETag"],
 )
 
+# Operators can send "X-Trace: 1" to record algorithm traces for a single
+# request; they can be read back from /game/trace using the returned
+# X-Trace-Id. The header is ignored on everyone else's requests.
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    if not request.headers.get("x-trace") or not request_operator(request):
+        return await call_next(request)
+
+    request_id = uuid.uuid4().hex
+    with trace.tracing(request_id):
+        response = await call_next(request)
+    response.headers["X-Trace-Id"] = request_id
+    return response
+
+# Added last so it is the outermost middleware and times everything else
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated(request: Request, exc: ExecutorSaturated):
+    return JSONResponse(status_code=503, content={"detail": "Server busy, try again"}, headers={"Retry-After": "1"})
+
+@app.exception_handler(TaskTimeout)
+async def task_timeout(request: Request, exc: TaskTimeout):
+    return JSONResponse(status_code=504, content={"detail": "Puzzle computation timed out"})
+
 app.include_router(game_router, prefix="/game")
+app.include_router(stream_router, prefix="/game")
 app.include_router(auth_router, prefix="/auth")
+app.include_router(metrics_router)
 
 @app.get("/")
 def home():
@@ -0,0 +1,248 @@
+import inspect
+import os
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from threading import Lock
+
+# METRICS_ENABLED=0 leaves every hook out: timed() returns the function
+# unchanged and the middleware and store wrapper are not installed. /metrics
+# then only reports the gauges.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+
+# Seconds; fine at the low end, where algorithm calls and cached routes sit
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, name, help, labels, buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [per-bucket counts (+Inf last), sum]. Observations
+        # don't take the lock: under the GIL a racing increment is at worst
+        # lost, which a latency histogram can afford.
+        self.series = {}
+        self._lock = Lock()
+
+    def labels_series(self, values):
+        # The [counts, sum] pair for one set of label values, so hot callers
+        # can look it up once and skip the dict and lock on every observation
+        with self._lock:
+            series = self.series.get(values)
+            if series is None:
+                series = self.series[values] = [[0] * (len(self.buckets) + 1), 0.0]
+            return series
+
+    def observe(self, values, seconds):
+        series = self.series.get(values) or self.labels_series(values)
+        series[0][bisect_left(self.buckets, seconds)] += 1
+        series[1] += seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {values: (counts[:], total) for values, (counts, total) in self.series.items()}
+
+    def since(self, before):
+        # The observations made after snapshot() returned before
+        changes = {}
+        for values, (counts, total) in self.snapshot().items():
+            old_counts, old_total = before.get(values, (None, 0.0))
+            if old_counts is not None:
+                counts = [count - old for count, old in zip(counts, old_counts)]
+            if any(counts):
+                changes[values] = (counts, total - old_total)
+        return changes
+
+    def merge(self, changes):
+        # Adds observations made elsewhere, e.g. in an executor process
+        for values, (counts, total) in changes.items():
+            series = self.series.get(values) or self.labels_series(values)
+            for index, count in enumerate(counts):
+                series[0][index] += count
+            series[1] += total
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(values, counts[:], total) for values, (counts, total) in self.series.items()]
+        for values, counts, total in sorted(series):
+            labels = ",".join(f'{key}="{escape(value)}"' for key, value in zip(self.labels, values))
+            prefix = labels + "," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+            suffix = "{" + labels + "}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+http_requests = Histogram("http_request_duration_seconds", "Request latency by route", ("method", "route", "status"))
+http_db = Histogram("http_request_db_seconds", "Time per request spent in store calls", ("method", "route"))
+http_algorithm = Histogram("http_request_algorithm_seconds", "Time per request spent in algorithms",
+                           ("method", "route"))
+algorithm_calls = Histogram("algorithm_duration_seconds", "Algorithm call latency", ("function",))
+algorithm_tasks = Histogram("algorithm_task_seconds", "Executor task time, queued and running",
+                            ("executor", "function", "phase"))
+db_operations = Histogram("db_operation_duration_seconds", "Store call latency", ("backend", "operation"))
+
+HISTOGRAMS = [http_requests, http_db, http_algorithm, algorithm_calls, algorithm_tasks, db_operations]
+
+# Callables returning {name: (help, {labels tuple: value})} gauges at scrape time
+_collectors = []
+
+
+def register_collector(collect, labels=()):
+    _collectors.append((collect, labels))
+
+
+def render():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    for collect, label_names in _collectors:
+        for name, (help, samples) in collect().items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} gauge")
+            for values, value in samples.items():
+                if value is None:
+                    continue
+                labels = ",".join(f'{key}="{escape(v)}"' for key, v in zip(label_names, values))
+                lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+# -------- PER-REQUEST BREAKDOWN --------
+# The middleware puts a [db, algorithm, depth] accumulator in the request's
+# context; only the outermost timed algorithm call adds to it, so nested
+# calls aren't counted twice.
+_request = ContextVar("metrics_request", default=None)
+
+
+def start_request():
+    return _request.set([0.0, 0.0, 0])
+
+
+def finish_request(token):
+    totals = _request.get()
+    _request.reset(token)
+    return totals[0], totals[1]
+
+
+def add_db_time(seconds):
+    totals = _request.get()
+    if totals is not None:
+        totals[0] += seconds
+
+
+def add_algorithm_time(seconds):
+    totals = _request.get()
+    if totals is not None and not totals[2]:
+        totals[1] += seconds
+
+
+def timed(fn):
+    # Records every call of an algorithms function
+    if not METRICS_ENABLED:
+        return fn
+    series = algorithm_calls.labels_series((f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__qualname__}",))
+    counts = series[0]
+    buckets = algorithm_calls.buckets
+    clock = time.perf_counter
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        totals = _request.get()
+        if totals is not None:
+            totals[2] += 1
+        start = clock()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            seconds = clock() - start
+            counts[bisect_left(buckets, seconds)] += 1
+            series[1] += seconds
+            if totals is not None:
+                totals[2] -= 1
+                if not totals[2]:
+                    totals[1] += seconds
+    return wrapper
+
+
+class TimedStore:
+    # Wraps a MongoStore or MemoryStore and times every coroutine method
+    def __init__(self, store, backend):
+        self.store = store
+        self.backend = backend
+        self._wrapped = {}
+
+    def __getattr__(self, name):
+        wrapped = self._wrapped.get(name)
+        if wrapped is not None:
+            return wrapped
+        attr = getattr(self.store, name)
+        if not inspect.iscoroutinefunction(attr) or name in ("init", "close"):
+            return attr
+
+        values = (self.backend, name)
+
+        async def call(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await attr(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                db_operations.observe(values, seconds)
+                add_db_time(seconds)
+
+        self._wrapped[name] = call
+        return call
+
+
+def route_template(scope):
+    # Older FastAPI copies included routes with their prefix into
+    # scope["route"]; newer releases keep the original route there and record
+    # the prefixed one as the effective route context
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    route = getattr(context, "starlette_route", None) or context or scope.get("route")
+    return getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    # Plain ASGI middleware: one histogram observation per HTTP request,
+    # labelled with the route template rather than the raw path
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = start_request()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            db, algorithm = finish_request(token)
+            route = route_template(scope)
+            http_requests.observe((scope["method"], route, str(status)), elapsed)
+            http_db.observe((scope["method"], route), db)
+            http_algorithm.observe((scope["method"], route), algorithm)
@@ -7,7 +7,7 @@ class GameState(BaseModel):
     puzzle1_end_time: Optional[str] = None  
     puzzle2_start_time: Optional[str] = None  
     puzzle2_end_time: Optional[str] = None   
-    total_time: Optional[str] = None  
+    total_time: Optional[float] = None  # seconds
 
 class UserCreate(BaseModel):
     username: str
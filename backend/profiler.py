@@ -0,0 +1,87 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# The sampling profiler is off unless PROFILER_ENABLED=1; when enabled it
+# only runs between a start and a stop (or its time limit).
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "0") == "1"
+PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL", "0.005"))
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+MAX_DEPTH = 64
+
+
+def frame_stack(frame):
+    stack = []
+    while frame is not None and len(stack) < MAX_DEPTH:
+        code = frame.f_code
+        stack.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class SamplingProfiler:
+    # Samples the stack of every thread at a fixed interval and counts the
+    # collapsed stacks (the format flame graph tools read)
+    def __init__(self, interval=PROFILER_INTERVAL, max_seconds=PROFILER_MAX_SECONDS):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.samples = Counter()
+        self.started_at = None
+        self.stopped_at = None
+        self._stopped = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds=None, interval=None):
+        if self.running:
+            return False
+        self.samples = Counter()
+        self.interval = interval or self.interval
+        self.started_at = time.time()
+        self.stopped_at = None
+        self._stopped.clear()
+        deadline = time.monotonic() + min(seconds or self.max_seconds, self.max_seconds)
+        self._thread = threading.Thread(target=self._sample_loop, args=(deadline,), name="profiler", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _sample_loop(self, deadline):
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval) and time.monotonic() < deadline:
+            stacks = [frame_stack(frame) for ident, frame in sys._current_frames().items() if ident != own]
+            with self._lock:
+                self.samples.update(stacks)
+        self.stopped_at = time.time()
+
+    def collapsed(self, limit=None):
+        with self._lock:
+            top = self.samples.most_common(limit)
+        return "\n".join(f"{stack} {count}" for stack, count in top) + "\n"
+
+    def stats(self):
+        with self._lock:
+            samples, stacks = sum(self.samples.values()), len(self.samples)
+        return {
+            "enabled": PROFILER_ENABLED,
+            "running": self.running,
+            "interval": self.interval,
+            "samples": samples,
+            "stacks": stacks,
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+        }
+
+
+profiler = SamplingProfiler()
@@ -0,0 +1,146 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from algorithms.sudoku_generator import generate_sudoku_puzzle, DIFFICULTY_TARGETS
+from algorithms.queens_generator import generate_queens_map
+from algorithms.executor import algorithm_executor, ExecutorSaturated, TaskTimeout
+
+DIFFICULTIES = list(DIFFICULTY_TARGETS)
+
+SUDOKU_POOL_SIZE = int(os.getenv("SUDOKU_POOL_SIZE", "32"))
+SUDOKU_POOL_WORKERS = int(os.getenv("SUDOKU_POOL_WORKERS", "1"))
+# Optional JSON file the pool is saved to on shutdown and loaded from on startup
+SUDOKU_POOL_FILE = os.getenv("SUDOKU_POOL_FILE")
+
+# N-Queens maps are pooled per board size; queues are named by the size
+QUEENS_POOL_SIZES = os.getenv("QUEENS_POOL_SIZES", "8").split(",")
+QUEENS_POOL_SIZE = int(os.getenv("QUEENS_POOL_SIZE", "32"))
+QUEENS_POOL_WORKERS = int(os.getenv("QUEENS_POOL_WORKERS", "1"))
+QUEENS_POOL_FILE = os.getenv("QUEENS_POOL_FILE")
+
+RATE_WINDOW = 60
+# Seconds a refill thread waits after an unexpected error, doubling up to
+# the maximum while the errors continue
+ERROR_BACKOFF = 1.0
+MAX_ERROR_BACKOFF = 60.0
+
+logger = logging.getLogger(__name__)
+
+
+class PuzzlePool:
+    def __init__(self, difficulties=DIFFICULTIES, size=SUDOKU_POOL_SIZE, workers=SUDOKU_POOL_WORKERS,
+                 path=SUDOKU_POOL_FILE, generator=generate_sudoku_puzzle, name="sudoku"):
+        self.name = name
+        self.difficulties = difficulties
+        self.size = size
+        self.workers = workers
+        self.path = path
+        self.generator = generator
+        self.queues = {name: deque() for name in difficulties}
+        self.served = 0
+        self.misses = 0
+        self.generated = 0
+        self.errors = 0
+        self._generated_at = deque(maxlen=1024)
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def start(self):
+        self.load()
+        self._stopped.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._refill_loop, name=f"{self.name}-pool-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.save()
+
+    def try_get(self, difficulty="medium"):
+        # deque.popleft is atomic, so no lock is needed on the request path
+        self._wakeup.set()
+        try:
+            entry = self.queues[difficulty].popleft()
+        except (KeyError, IndexError):
+            self.misses += 1
+            return None
+        self.served += 1
+        return entry
+
+    def get(self, difficulty="medium"):
+        return self.try_get(difficulty) or self.generator(difficulty)
+
+    def _next_to_refill(self):
+        # Refill the emptiest queue first
+        name = min(self.queues, key=lambda name: len(self.queues[name]))
+        return name if len(self.queues[name]) < self.size else None
+
+    def _refill_loop(self):
+        backoff = ERROR_BACKOFF
+        while not self._stopped.is_set():
+            name = self._next_to_refill()
+            if name is None:
+                self._wakeup.wait(timeout=1)
+                self._wakeup.clear()
+                continue
+
+            # Generation runs on the algorithm workers; requests take
+            # priority when they are saturated
+            try:
+                entry = algorithm_executor.call(self.generator, name)
+            except (ExecutorSaturated, TaskTimeout):
+                self._stopped.wait(timeout=0.1)
+                continue
+            except Exception:
+                # Keep the thread alive; requests generate inline meanwhile
+                self.errors += 1
+                logger.exception("%s pool refill failed for %s, retrying in %.0fs", self.name, name, backoff)
+                self._stopped.wait(timeout=backoff)
+                backoff = min(backoff * 2, MAX_ERROR_BACKOFF)
+                continue
+            backoff = ERROR_BACKOFF
+            self.queues[name].append(entry)
+            self.generated += 1
+            self._generated_at.append(time.monotonic())
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            saved = json.load(f)
+        for name, entries in saved.items():
+            if name in self.queues:
+                self.queues[name].extend((puzzle, solution) for puzzle, solution in entries[:self.size])
+
+    def save(self):
+        if not self.path:
+            return
+        with open(self.path, "w") as f:
+            json.dump({name: list(entries) for name, entries in self.queues.items()}, f)
+
+    def stats(self):
+        now = time.monotonic()
+        recent = sum(1 for t in self._generated_at if now - t <= RATE_WINDOW)
+        return {
+            "depth": {name: len(entries) for name, entries in self.queues.items()},
+            "capacity": self.size,
+            "served": self.served,
+            "misses": self.misses,
+            "generated": self.generated,
+            "errors": self.errors,
+            "refill_rate": recent / RATE_WINDOW,
+        }
+
+
+sudoku_pool = PuzzlePool()
+queens_pool = PuzzlePool(difficulties=QUEENS_POOL_SIZES, size=QUEENS_POOL_SIZE, workers=QUEENS_POOL_WORKERS,
+                         path=QUEENS_POOL_FILE, generator=generate_queens_map, name="queens")
@@ -0,0 +1,101 @@
+import asyncio
+import os
+import time
+from algorithms import validation_cache
+from algorithms.solution_index import build_index
+from algorithms.executor import algorithm_executor
+
+# Room definitions are re-read from the rooms collection at most this often;
+# rooms whose document didn't change keep their solver tables.
+ROOM_REGISTRY_TTL = float(os.getenv("ROOM_REGISTRY_TTL", "60"))
+
+
+class Room:
+    # One room document plus the solver state derived from it. A room's
+    # "puzzle" is {"type": "nqueens", "colors": [[...]]}, {"type": "nqueens",
+    # "size": 8, "generated": true} for a fresh map per player, or
+    # {"type": "sudoku", "difficulty": "medium"}.
+    def __init__(self, doc):
+        self.doc = doc
+        self.id = doc["id"]
+        puzzle = doc.get("puzzle") or {}
+        self.kind = puzzle.get("type")
+        self.colors = puzzle.get("colors")
+        self.size = len(self.colors) if self.colors else puzzle.get("size")
+        self.difficulty = puzzle.get("difficulty")
+        self.generated = bool(puzzle.get("generated"))
+        self.map_id = validation_cache.register_map(self.colors) if self.colors else None
+        self._index = None
+        self._indexed = False
+        self._lock = asyncio.Lock()
+
+    async def solution_index(self):
+        # Built on first use on the algorithm workers; None when the map has
+        # too many solutions to index
+        if not self._indexed:
+            async with self._lock:
+                if not self._indexed:
+                    self._index = await algorithm_executor.run(build_index, self.colors)
+                    self._indexed = True
+        return self._index
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "name": self.doc.get("name"),
+            "difficulty": self.doc.get("difficulty"),
+            "locked": self.doc.get("locked", False),
+            "key_required": self.doc.get("key_required"),
+            "items": self.doc.get("items", []),
+            "puzzle": {"type": self.kind, "size": self.size, "difficulty": self.difficulty,
+                       "generated": self.generated},
+        }
+
+
+class RoomRegistry:
+    def __init__(self, ttl=ROOM_REGISTRY_TTL):
+        self.ttl = ttl
+        self.rooms = {}
+        self.loaded_at = None
+        self.loads = 0
+        self.rebuilt = 0
+
+    async def _refresh(self, store):
+        if self.loaded_at is not None and time.monotonic() - self.loaded_at < self.ttl:
+            return
+
+        rooms = {}
+        for doc in await store.list_rooms():
+            if "id" not in doc:
+                continue
+            room = self.rooms.get(doc["id"])
+            if room is None or room.doc != doc:
+                room = Room(doc)
+                self.rebuilt += 1
+            rooms[doc["id"]] = room
+        self.rooms = rooms
+        self.loaded_at = time.monotonic()
+        self.loads += 1
+
+    async def get(self, store, room_id):
+        await self._refresh(store)
+        return self.rooms.get(room_id)
+
+    async def all(self, store):
+        await self._refresh(store)
+        return list(self.rooms.values())
+
+    def invalidate(self):
+        # The next lookup re-reads the collection
+        self.loaded_at = None
+
+    def stats(self):
+        return {
+            "rooms": len(self.rooms),
+            "indexed": sum(1 for room in self.rooms.values() if room._indexed),
+            "loads": self.loads,
+            "rebuilt": self.rebuilt,
+        }
+
+
+room_registry = RoomRegistry()
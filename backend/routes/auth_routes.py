@@ -4,18 +4,41 @@ from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from jose import jwt
 import os
-from database import users_collection
+import time
+from store import get_store, DuplicateUser
+from ttl_cache import TTLCache
 from fastapi import Depends, Request
+from algorithms.executor import AlgorithmExecutor, ExecutorSaturated, TaskTimeout
 from jose import JWTError, jwt
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 # Secret Key for JWT
 SECRET_KEY = os.getenv("SECRET_KEY", "your_secret_key")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Verified token -> email. Entries never outlive the token's own exp.
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+
+# Password hashing. Hashes with a different cost are upgraded at login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# bcrypt gets its own small pool so a login burst can't starve the default
+# threadpool that sync game routes run on. bcrypt releases the GIL, so
+# threads are enough. Requests beyond the queue cap get a 429.
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", str(PASSWORD_WORKERS * 8)))
+PASSWORD_TASK_TIMEOUT = float(os.getenv("PASSWORD_TASK_TIMEOUT", "10"))
+password_executor = AlgorithmExecutor(kind="thread", workers=PASSWORD_WORKERS,
+                                      timeout=PASSWORD_TASK_TIMEOUT, max_pending=PASSWORD_MAX_PENDING,
+                                      name="passwords")
+
+# Accounts allowed to use the diagnostic endpoints; nobody is an operator
+# unless OPERATOR_EMAILS (comma separated) names them
+OPERATOR_EMAILS = set(email.strip().lower() for email in os.getenv("OPERATOR_EMAILS", "").split(",") if email.strip())
 
 # Router
 router = APIRouter()
@@ -38,51 +61,105 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+# Verifies and, if the hash uses outdated settings, returns a new one
+def verify_and_update_password(plain_password: str, hashed_password: str):
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+async def run_password_task(fn, *args):
+    try:
+        return await password_executor.run(fn, *args)
+    except (ExecutorSaturated, TaskTimeout):
+        raise HTTPException(status_code=429, detail="Too many login attempts, try again",
+                            headers={"Retry-After": "1"})
+
 # Utility to create JWT token
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
-    # Only add 'exp' if expiration is desired
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-        to_encode.update({"exp": expire})
+    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-security = HTTPBearer()
+def verify_token(credentials: str) -> str:
+    email = token_cache.get(credentials)
+    if email is not None:
+        return email
 
-def get_current_user(token: HTTPAuthorizationCredentials = Depends(security)):
     try:
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        email = payload.get("sub")
-        if email is None:
-            raise HTTPException(status_code=401, detail="Invalid token payload")
-        return email
+        payload = jwt.decode(credentials, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
+    email = payload.get("sub")
+    if email is None:
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+
+    ttl = TOKEN_CACHE_TTL
+    if payload.get("exp") is not None:
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        token_cache.set(credentials, email, ttl=ttl)
+    return email
+
+security = HTTPBearer()
+
+# FastAPI resolves a dependency once per request, so the router-level and
+# per-route uses of this share one verification. It is async so cache hits
+# don't pay for a threadpool hop.
+async def get_current_user(token: HTTPAuthorizationCredentials = Depends(security)):
+    return verify_token(token.credentials)
+
+def is_operator(email: str) -> bool:
+    return email.lower() in OPERATOR_EMAILS
+
+async def require_operator(user_id: str = Depends(get_current_user)):
+    if not is_operator(user_id):
+        raise HTTPException(status_code=403, detail="Operators only")
+    return user_id
+
+# The operator behind a request's bearer token, or None
+def request_operator(request: Request):
+    scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+    if not OPERATOR_EMAILS or scheme.lower() != "bearer" or not credentials:
+        return None
+    try:
+        email = verify_token(credentials)
+    except HTTPException:
+        return None
+    return email if is_operator(email) else None
+
 # Register User
 @router.post("/register")
-def register_user(user: UserRegister):
-    existing_user = users_collection.find_one({"email": user.email})
+async def register_user(user: UserRegister, store=Depends(get_store)):
+    existing_user = await store.find_user(user.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = hash_password(user.password)
+    hashed_password = await run_password_task(hash_password, user.password)
     new_user = {
         "username": user.username,
         "email": user.email,
         "password": hashed_password,
         "created_at": datetime.utcnow()
     }
-    users_collection.insert_one(new_user)
+    try:
+        await store.create_user(new_user)
+    except DuplicateUser:
+        raise HTTPException(status_code=400, detail="Email already registered")
 
     return {"message": "User registered successfully"}
 
 # Login User
 @router.post("/login")
-def login_user(user: UserLogin):
-    db_user = users_collection.find_one({"email": user.email})
-    if not db_user or not verify_password(user.password, db_user["password"]):
+async def login_user(user: UserLogin, store=Depends(get_store)):
+    db_user = await store.find_user(user.email)
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+
+    valid, new_hash = await run_password_task(verify_and_update_password, user.password, db_user["password"])
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid email or password")
+    if new_hash:
+        await store.set_password(db_user["email"], new_hash)
 
     access_token = create_access_token({"sub": db_user["email"]})
     return {"access_token": access_token, "token_type": "bearer"}
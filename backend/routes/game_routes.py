@@ -1,19 +1,24 @@
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Request, Query, Response
 from pydantic import BaseModel
-from datetime import datetime
-from typing import List, Optional
-from datetime import datetime, timedelta
+from typing import List, Optional, Union
 from colors import predefined_colors
-from algorithms.backtracking_solver import solve_n_queens
-from algorithms.dp_validator import is_valid_board
-from algorithms.greedy_hint import get_next_hint
-from database import game_sessions, users_collection
-from models import GameState
+from algorithms.bitmask_solver import solve_n_queens
+from algorithms import validation_cache, solution_index, trace
+from algorithms.greedy_hint import get_next_hint, get_next_hints
+from algorithms.solution_index import lookup_index, store_index, store_generated, build_index, is_registered
+from algorithms.executor import algorithm_executor
+from store import get_store
+from session_cache import CachedSessionStore
+from dashboard_cache import dashboard_snapshots
+from rooms import room_registry
+from puzzle_pool import sudoku_pool, queens_pool, DIFFICULTIES
+from algorithms.queens_generator import generate_queens_map
 from algorithms.sudoku_generator import generate_sudoku_puzzle
 from algorithms.sudoku_validator import is_valid_sudoku
 from algorithms.sudoku_hint import get_sudoku_hint
-from routes.auth_routes import get_current_user
-from helper import calculate_duration
+from algorithms.sudoku_core import parse_board
+from routes.auth_routes import get_current_user, require_operator, token_cache, password_executor
+from helper import calculate_duration, format_duration
 
 
 # ✅ Enforce JWT Auth Globally
@@ -32,233 +37,376 @@ class TimerData(BaseModel):
 class SudokuBoard(BaseModel):
     board: List[List[int]]  # 9x9 grid
 
+class BoardBatch(BaseModel):
+    room_id: str
+    boards: List[List[int]]
+    colors: List[List[int]]
+
+class SudokuBoardBatch(BaseModel):
+    boards: List[List[List[int]]]
+
+class SudokuHintData(BaseModel):
+    board: Union[List[List[int]], str]  # 9x9 grid or the compact 81-digit string
+
+class RoomData(BaseModel):
+    room_id: Optional[str] = None
+
+# Rooms used when the client doesn't name one
+DEFAULT_NQUEENS_ROOM = "room1"
+DEFAULT_SUDOKU_ROOM = "room2"
+
+MAX_BATCH_SIZE = 500
+# Largest N-Queens map accepted from clients; search time grows fast with n
+MAX_BOARD_SIZE = 16
+
+def check_batch_size(boards):
+    if len(boards) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SIZE} boards per batch")
+
+# Runs before anything reaches the algorithm workers, which can't be
+# stopped once a search has started
+def check_board_data(data):
+    n = len(data.colors)
+    if not 0 < n <= MAX_BOARD_SIZE or any(len(row) != n for row in data.colors):
+        raise HTTPException(status_code=400, detail=f"colors must be a square grid of at most {MAX_BOARD_SIZE} rows")
+    boards = data.boards if isinstance(data, BoardBatch) else [data.board]
+    if any(len(board) != n or any(not -1 <= col < n for col in board) for board in boards):
+        raise HTTPException(status_code=400, detail="A board needs one column (or -1) for each row of colors")
+
 # ------------------------------------------- N QUEENS -------------------------------------------
+async def puzzle_room(store, room_id, kind):
+    # The registered room of that puzzle type, or None
+    room = await room_registry.get(store, room_id)
+    return room if room and room.kind == kind else None
+
+async def fixed_map_room(store, room_id):
+    # An N-Queens room with its own color map; generated rooms give every
+    # player a different map, which the client sends back with each board
+    room = await puzzle_room(store, room_id, "nqueens")
+    return room if room and room.colors else None
+
+def remember_generated_map(colors, solution):
+    # The client sends its generated map back with every board; registering
+    # it lets validation and hints hit the caches as a room's map does
+    validation_cache.register_map(colors, pinned=False)
+    store_generated(colors, solution)
+
 @router.post("/generate")
-def generate_board(user_id: str = Depends(get_current_user)):
-    room = game_sessions.find_one({"user_id": user_id})
-    
-    if not room:
-        game_sessions.insert_one(GameState(user_id=user_id).dict())
-    elif room.get("puzzle1_end_time"):
+async def generate_board(data: Optional[RoomData] = None, user_id: str = Depends(get_current_user), store=Depends(get_store)):
+    session = await store.ensure_session(user_id)
+
+    if session.get("puzzle1_end_time"):
         raise HTTPException(status_code=400, detail="N-Queens already completed")
 
+    room = await puzzle_room(store, (data and data.room_id) or DEFAULT_NQUEENS_ROOM, "nqueens")
+    if room and room.generated:
+        size = str(room.size or 8)
+        colors, solution = queens_pool.try_get(size) or await algorithm_executor.run(generate_queens_map, size)
+        remember_generated_map(colors, solution)
+    else:
+        colors = room.colors if room else predefined_colors[8]
     return {
-        "board": [-1] * 8,
-        "colors": predefined_colors[8],
-        "size": 8
+        "board": [-1] * len(colors),
+        "colors": colors,
+        "size": len(colors)
     }
 
 @router.post("/start")
-def start_timer(user_id: str = Depends(get_current_user)):
-    session = game_sessions.find_one({"user_id": user_id})
-    if not session:
+async def start_timer(user_id: str = Depends(get_current_user), store=Depends(get_store)):
+    started = await store.start_puzzle(user_id, 1)
+    if started is None:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    if session.get("puzzle1_start_time"):
+    if not started:
         return {"message": "N-Queens already started"}
 
-    game_sessions.update_one(
-        {"user_id": user_id},
-        {"$set": {"puzzle1_start_time": datetime.utcnow()}}
-    )
     return {"message": "N-Queens timer started"}
 
 @router.post("/end-timer")
-def end_timer(user_id: str = Depends(get_current_user)):
-    session = game_sessions.find_one({"user_id": user_id})
-    if not session:
+async def end_timer(user_id: str = Depends(get_current_user), store=Depends(get_store)):
+    session = await store.finish_puzzle(user_id, 1)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    start_time = session.get("puzzle1_start_time")
-    if not start_time:
+    if not session:
         raise HTTPException(status_code=400, detail="Puzzle not started yet")
 
-    end_time = datetime.utcnow()
-    duration = end_time - start_time
-
-    game_sessions.update_one(
-        {"user_id": user_id},
-        {"$set": {
-            "puzzle1_end_time": end_time,
-            "total_time": str(duration)
-        }}
-    )
-
+    dashboard_snapshots.invalidate()
     return {"message": "N-Queens completed"}
 
-@router.post("/validate")
-def validate_board(data: BoardData):
-    if -1 in data.board:
+def validation_result(board, valid):
+    if -1 in board:
         return {"valid": False, "message": "Place all queens first."}
-    
-    board_tuple = tuple(data.board)
-    colors_tuple = tuple(tuple(row) for row in data.colors)
-    valid = is_valid_board(board_tuple, colors_tuple)
-
     return {"valid": valid, "message": "Valid!" if valid else "Invalid arrangement!"}
 
+# A registered room's color map wins over the one the client sent; unknown
+# rooms fall back to the client's map.
+async def board_colors(store, data):
+    room = await fixed_map_room(store, data.room_id)
+    if room:
+        return room.colors, room.map_id
+    return data.colors, None
+
+@router.post("/validate")
+async def validate_board(data: BoardData, store=Depends(get_store)):
+    check_board_data(data)
+    colors, map_id = await board_colors(store, data)
+    valid = -1 not in data.board and validation_cache.is_valid(data.board, colors, map_id)
+    return validation_result(data.board, valid)
+
+# Searches run on the algorithm workers; index lookups are cheaper than the
+# round trip so they stay on the event loop. Maps the server doesn't know get
+# no index (None), and callers fall back to a plain search.
+async def solution_index_for(colors):
+    found, index = lookup_index(colors)
+    if not found and is_registered(colors):
+        index = await algorithm_executor.run(build_index, colors)
+        store_index(colors, index)
+    return index
+
+# Rooms keep their own index, so many rooms don't compete for the shared LRU
+async def room_solution_index(store, data):
+    room = await fixed_map_room(store, data.room_id)
+    if room:
+        return room.colors, await room.solution_index()
+    return data.colors, await solution_index_for(data.colors)
+
 @router.post("/solve")
-def solve_puzzle(data: BoardData):
-    solution = solve_n_queens(8, data.colors)
+async def solve_puzzle(data: BoardData, store=Depends(get_store)):
+    check_board_data(data)
+    colors, index = await room_solution_index(store, data)
+    if index:
+        return {"solution": index.solution()}
+
+    solution = await algorithm_executor.run(solve_n_queens, len(colors), colors)
     return {"solution": solution}
 
 @router.post("/hint")
-def get_hint(data: BoardData):
-    result = get_next_hint(data.board, data.colors)
+async def get_hint(data: BoardData, store=Depends(get_store)):
+    check_board_data(data)
+    colors, index = await room_solution_index(store, data)
+    if index:
+        return index.next_hint(data.board)
+
+    result = await algorithm_executor.run(get_next_hint, data.board, colors)
     return result
 
+# Batches share one color-map lookup / solution index and keep results in order
+@router.post("/batch/validate")
+async def validate_boards(data: BoardBatch, store=Depends(get_store)):
+    check_batch_size(data.boards)
+    check_board_data(data)
+    colors, map_id = await board_colors(store, data)
+    complete = [board for board in data.boards if -1 not in board]
+    verdicts = iter(validation_cache.is_valid_many(complete, colors, map_id))
+    return {"results": [validation_result(board, False if -1 in board else next(verdicts)) for board in data.boards]}
+
+@router.post("/batch/hint")
+async def get_hints(data: BoardBatch, store=Depends(get_store)):
+    check_batch_size(data.boards)
+    check_board_data(data)
+    colors, index = await room_solution_index(store, data)
+    if index:
+        return {"results": [index.next_hint(board) for board in data.boards]}
+    return {"results": await algorithm_executor.run(get_next_hints, data.boards, colors)}
+
 # ------------------------------------------- SUDOKU -------------------------------------------
 @router.post("/sudoku/generate")
-def generate_sudoku(user_id: str = Depends(get_current_user)):
-    session = game_sessions.find_one({"user_id": user_id})
-    
-    if not session:
-        game_sessions.insert_one(GameState(user_id=user_id).dict())
-    elif session.get("puzzle2_end_time"):
+async def generate_sudoku(
+    data: Optional[RoomData] = None,
+    difficulty: Optional[str] = None,
+    user_id: str = Depends(get_current_user),
+    store=Depends(get_store)
+):
+    # Checked before a pooled puzzle is used up; set_sudoku still catches a
+    # session completed in the meantime
+    session = await store.ensure_session(user_id)
+    if session.get("puzzle2_end_time"):
         raise HTTPException(status_code=400, detail="Sudoku already completed")
 
-    puzzle, solution = generate_sudoku_puzzle()
+    # An explicit difficulty wins over the room's
+    if difficulty is None:
+        room = await puzzle_room(store, (data and data.room_id) or DEFAULT_SUDOKU_ROOM, "sudoku")
+        difficulty = (room and room.difficulty) or "medium"
+    if difficulty not in DIFFICULTIES:
+        raise HTTPException(status_code=400, detail="Unknown difficulty")
 
-    game_sessions.update_one(
-        {"user_id": user_id},
-        {"$set": {
-            "sudoku_board": puzzle,  
-            "sudoku_solution": solution
-        }}
-    )
+    puzzle, solution = sudoku_pool.try_get(difficulty) or await algorithm_executor.run(generate_sudoku_puzzle, difficulty)
+
+    if not await store.set_sudoku(user_id, puzzle, solution):
+        raise HTTPException(status_code=400, detail="Sudoku already completed")
 
     return {"board": puzzle}
 
 @router.post("/sudoku/start")
-def start_sudoku_timer(user_id: str = Depends(get_current_user)):
-    session = game_sessions.find_one({"user_id": user_id})
-    if not session:
+async def start_sudoku_timer(user_id: str = Depends(get_current_user), store=Depends(get_store)):
+    started = await store.start_puzzle(user_id, 2)
+    if started is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    if session.get("puzzle2_start_time"):
+    if not started:
         return {"message": "Sudoku already started"}
 
-    game_sessions.update_one(
-        {"user_id": user_id},
-        {"$set": {"puzzle2_start_time": datetime.utcnow()}}
-    )
     return {"message": "Sudoku timer started"}
 
 @router.post("/sudoku/end-timer")
-def end_sudoku_timer(user_id: str = Depends(get_current_user)):
-    session = game_sessions.find_one({"user_id": user_id})
-    if not session:
+async def end_sudoku_timer(user_id: str = Depends(get_current_user), store=Depends(get_store)):
+    session = await store.finish_puzzle(user_id, 2)
+    if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    start_time = session.get("puzzle2_start_time")
-    if not start_time:
+    if not session:
         raise HTTPException(status_code=400, detail="Sudoku not started yet")
 
-    end_time = datetime.utcnow()
-    duration = end_time - start_time
-
-    game_sessions.update_one(
-        {"user_id": user_id},
-        {"$set": {
-            "puzzle2_end_time": end_time,
-            "total_time": str(duration)
-        }}
-    )
-
+    dashboard_snapshots.invalidate()
     return {"message": "Sudoku completed"}
 
-@router.post("/sudoku/validate")
-def validate_sudoku(data: SudokuBoard):
-    is_valid = is_valid_sudoku(data.board)
+def sudoku_validation_result(is_valid):
     return {
         "valid": is_valid,
         "message": "Valid Sudoku!" if is_valid else "Invalid Sudoku!"
     }
 
+@router.post("/sudoku/validate")
+def validate_sudoku(data: SudokuBoard):
+    is_valid = is_valid_sudoku(data.board)
+    return sudoku_validation_result(is_valid)
+
+@router.post("/sudoku/batch/validate")
+def validate_sudoku_boards(data: SudokuBoardBatch):
+    check_batch_size(data.boards)
+    return {"results": [sudoku_validation_result(is_valid_sudoku(board)) for board in data.boards]}
+
+def sudoku_cells(board):
+    try:
+        return parse_board(board)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
 @router.post("/sudoku/hint")
 async def get_sudoku_hint_route(
-    request: Request,
-    user_id: str = Depends(get_current_user)
+    data: SudokuHintData,
+    user_id: str = Depends(get_current_user),
+    store=Depends(get_store)
 ):
-    data = await request.json()
-    board = data.get("board")
-
-    if not board:
-        raise HTTPException(status_code=400, detail="Missing board in request")
+    board = sudoku_cells(data.board)
 
-    session = game_sessions.find_one({"user_id": user_id})
+    session = await store.get_session(user_id)
     if not session or not session.get("sudoku_solution"):
         raise HTTPException(status_code=404, detail="No active Sudoku game found")
 
     solution = session["sudoku_solution"]
 
-    print("Generating Sudoku hint...")
     hint = get_sudoku_hint(board, solution)
-    print("Returning hint:", hint)
 
     return hint
 
-# ------------------------------------------- USER DATA -------------------------------------------
-@router.post("/dashboard")
-def get_all_user_dashboards(current_user_email: str = Depends(get_current_user)):
-    # Fetch users and game sessions from database and convert to hash tables
-    users = {user["email"]: user for user in users_collection.find()}
-    sessions = {session["user_id"]: session for session in game_sessions.find()}
+@router.post("/sudoku/batch/hint")
+async def get_sudoku_hints(data: SudokuBoardBatch, user_id: str = Depends(get_current_user), store=Depends(get_store)):
+    check_batch_size(data.boards)
+    boards = [sudoku_cells(board) for board in data.boards]
 
-    # Prepare the list of dashboards (hash tables for fast lookup)
-    dashboards = []
+    # One session read serves every board in the batch
+    session = await store.get_session(user_id)
+    if not session or not session.get("sudoku_solution"):
+        raise HTTPException(status_code=404, detail="No active Sudoku game found")
 
-    # Iterate over the users to build the dashboards
-    for user_email, user in users.items():
-        session = sessions.get(user_email)
+    solution = session["sudoku_solution"]
+    return {"results": [get_sudoku_hint(board, solution) for board in boards]}
 
-        if not session:
-            # Skip if no session exists for the user
-            continue
+# ------------------------------------------- ROOMS -------------------------------------------
+@router.get("/rooms")
+async def list_rooms(store=Depends(get_store)):
+    return {"rooms": [room.summary() for room in await room_registry.all(store)]}
 
-        # Retrieve the total time and check if it's valid
-        total_time = session.get("total_time")
+# ------------------------------------------- USER DATA -------------------------------------------
+DASHBOARD_PAGE_SIZE = 100
+DASHBOARD_MAX_PAGE_SIZE = 500
+
+def puzzle_duration(session, puzzle):
+    seconds = session.get(f"puzzle{puzzle}_duration")
+    if seconds is not None:
+        return format_duration(seconds)
+    return calculate_duration(session.get(f"puzzle{puzzle}_start_time"), session.get(f"puzzle{puzzle}_end_time"))
+
+async def build_dashboard(store, offset, limit):
+    # One page of sessions in total_time order, straight from the index
+    sessions = await store.top_sessions(offset, limit)
+    usernames = await store.usernames([session["user_id"] for session in sessions])
 
-        if total_time is None:
-            # Skip the user if total_time is None
+    dashboards = []
+    rank, previous_time = None, None
+    if offset and sessions:
+        # The page may start in the middle of a group of equal times
+        previous_time = sessions[0]["total_time"]
+        rank = await store.count_faster(previous_time) + 1
+
+    for position, session in enumerate(sessions, start=offset + 1):
+        total_time = session["total_time"]
+        # Equal times share a rank
+        if total_time != previous_time:
+            rank, previous_time = position, total_time
+
+        if session["user_id"] not in usernames:
             continue
 
-        # Convert total_time to seconds if it's a string
-        if isinstance(total_time, str):
-            try:
-                # Parse the string into a timedelta object
-                hours, minutes, seconds = total_time.split(":")
-                seconds, microseconds = seconds.split(".")
-                total_time = timedelta(
-                    hours=int(hours),
-                    minutes=int(minutes),
-                    seconds=int(seconds),
-                    microseconds=int(microseconds)
-                )
-            except ValueError:
-                # If the format is incorrect, skip this user
-                continue
-        
-        # Convert timedelta to total seconds
-        total_seconds = total_time.total_seconds()
-
-        # Construct the dashboard for the current user
-        dashboard = {
-            "username": user.get("username"),
-            "rank": "Rank",  # Placeholder for rank (this can be calculated later if needed)
-            "n_queens": {
-                "duration": calculate_duration(session.get("puzzle1_start_time"), session.get("puzzle1_end_time"))
-            },
-            "sudoku": {
-                "duration": calculate_duration(session.get("puzzle2_start_time"), session.get("puzzle2_end_time"))
-            },
-            "total_time": total_seconds,  # Send total time as seconds
-        }
-
-        dashboards.append(dashboard)
-
-    # Sort the dashboards based on the total_time (timedelta will work naturally for sorting)
-    dashboards.sort(key=lambda x: x["total_time"])
-
-    # Return the list of all user dashboards
+        dashboards.append({
+            "username": usernames[session["user_id"]],
+            "rank": rank,
+            "n_queens": {"duration": puzzle_duration(session, 1)},
+            "sudoku": {"duration": puzzle_duration(session, 2)},
+            "total_time": total_time,  # Send total time as seconds
+        })
+
     return dashboards
+
+# Served from an in-memory snapshot; clients that send the last ETag back in
+# If-None-Match get a 304 without any database work
+@router.api_route("/dashboard", methods=["GET", "POST"])
+async def get_all_user_dashboards(
+    request: Request,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(DASHBOARD_PAGE_SIZE, ge=1, le=DASHBOARD_MAX_PAGE_SIZE),
+    current_user_email: str = Depends(get_current_user),
+    store=Depends(get_store)
+):
+    snapshot = await dashboard_snapshots.get((offset, limit), lambda: build_dashboard(store, offset, limit))
+
+    if request.headers.get("if-none-match") == snapshot.etag:
+        dashboard_snapshots.not_modified += 1
+        return Response(status_code=304, headers={"ETag": snapshot.etag})
+
+    return Response(content=snapshot.body, media_type="application/json", headers={"ETag": snapshot.etag})
+
+@router.post("/dashboard/me")
+async def get_my_rank(current_user_email: str = Depends(get_current_user), store=Depends(get_store)):
+    session = await store.get_session(current_user_email)
+    total_players = await store.count_ranked()
+    if not session or not isinstance(session.get("total_time"), (int, float)):
+        return {"rank": None, "total_time": None, "total_players": total_players}
+
+    return {
+        "rank": await store.count_faster(session["total_time"]) + 1,
+        "total_time": session["total_time"],
+        "total_players": total_players,
+    }
+
+# ------------------------------------------- STATS -------------------------------------------
+@router.get("/stats", dependencies=[Depends(require_operator)])
+def get_stats(store=Depends(get_store)):
+    return {
+        "validation_cache": validation_cache.stats(),
+        "solution_indexes": solution_index.stats(),
+        "sudoku_pool": sudoku_pool.stats(),
+        "queens_pool": queens_pool.stats(),
+        "algorithm_executor": algorithm_executor.stats(),
+        "dashboard_snapshots": dashboard_snapshots.stats(),
+        "session_cache": store.stats() if isinstance(store, CachedSessionStore) else None,
+        "token_cache": token_cache.stats(),
+        "password_executor": password_executor.stats(),
+        "room_registry": room_registry.stats()
+    }
+
+@router.get("/trace", dependencies=[Depends(require_operator)])
+def get_trace(request_id: Optional[str] = None, clear: bool = False):
+    return trace.dump(request_id=request_id, clear=clear)
@@ -0,0 +1,102 @@
+import hmac
+import os
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+import metrics
+from profiler import profiler, PROFILER_ENABLED
+from algorithms import validation_cache
+from algorithms.executor import algorithm_executor
+from puzzle_pool import sudoku_pool, queens_pool
+from dashboard_cache import dashboard_snapshots
+from routes.auth_routes import require_operator, request_operator, token_cache, password_executor
+
+router = APIRouter()
+
+# Scrapers send METRICS_TOKEN as a bearer token; operators can use their own
+# login token. Without METRICS_TOKEN only operators can read the metrics.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+def collect_executors():
+    executors = [algorithm_executor, password_executor]
+    return {
+        "executor_pending": ("Tasks running or queued", {(e.name,): e.pending for e in executors}),
+        "executor_completed": ("Tasks completed", {(e.name,): e.completed for e in executors}),
+        "executor_rejected": ("Tasks rejected while saturated", {(e.name,): e.rejected for e in executors}),
+        "executor_timeouts": ("Tasks that timed out", {(e.name,): e.timeouts for e in executors}),
+    }
+
+
+def collect_pools():
+    depth = {}
+    for kind, pool in (("sudoku", sudoku_pool), ("queens", queens_pool)):
+        for name, entries in pool.queues.items():
+            depth[(kind, name)] = len(entries)
+    return {"puzzle_pool_depth": ("Pregenerated puzzles ready to serve", depth)}
+
+
+def collect_caches():
+    caches = {
+        "validation": validation_cache.stats(),
+        "token": token_cache.stats(),
+    }
+    return {
+        "cache_size": ("Entries held", {(name,): stats["size"] for name, stats in caches.items()}),
+        "cache_hit_rate": ("Hits over lookups", {(name,): stats["hit_rate"] for name, stats in caches.items()}),
+    }
+
+
+def collect_dashboard():
+    stats = dashboard_snapshots.stats()
+    return {
+        "dashboard_snapshot_rebuilds": ("Leaderboard snapshot rebuilds", {(): stats["rebuilds"]}),
+        "dashboard_snapshot_age_seconds": ("Age of the oldest snapshot", {(): stats["max_snapshot_age_seconds"]}),
+    }
+
+
+metrics.register_collector(collect_executors, ("executor",))
+metrics.register_collector(collect_pools, ("kind", "queue"))
+metrics.register_collector(collect_caches, ("cache",))
+metrics.register_collector(collect_dashboard)
+
+
+def require_metrics_access(request: Request):
+    scheme, _, credentials = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not credentials:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    if METRICS_TOKEN and hmac.compare_digest(credentials.encode(), METRICS_TOKEN.encode()):
+        return
+    if request_operator(request) is None:
+        raise HTTPException(status_code=403, detail="Operators only")
+
+
+# Prometheus text format
+@router.get("/metrics", dependencies=[Depends(require_metrics_access)], response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+# -------- SAMPLING PROFILER --------
+# Operators only (OPERATOR_EMAILS), and only when PROFILER_ENABLED is set
+def require_profiler(user_id: str = Depends(require_operator)):
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiler is disabled")
+    return user_id
+
+
+@router.post("/debug/profile/start", dependencies=[Depends(require_profiler)])
+def start_profile(seconds: float = None, interval: float = None):
+    if not profiler.start(seconds, interval):
+        raise HTTPException(status_code=409, detail="Profiler already running")
+    return profiler.stats()
+
+
+@router.post("/debug/profile/stop", dependencies=[Depends(require_profiler)], response_class=PlainTextResponse)
+def stop_profile(limit: int = None):
+    profiler.stop()
+    return PlainTextResponse(profiler.collapsed(limit))
+
+
+@router.get("/debug/profile", dependencies=[Depends(require_profiler)])
+def get_profile():
+    return profiler.stats()
@@ -0,0 +1,177 @@
+import json
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, status
+from colors import predefined_colors
+from algorithms.queens_state import QueensState
+from algorithms.sudoku_state import SudokuState
+from algorithms.greedy_hint import get_next_hint
+from algorithms.executor import algorithm_executor, ExecutorSaturated, TaskTimeout
+from routes.auth_routes import verify_token
+from routes.game_routes import solution_index_for, fixed_map_room, DEFAULT_NQUEENS_ROOM, MAX_BOARD_SIZE
+from store import get_store
+
+# Move streams: the client sends single moves and the server keeps the board
+# state, answering each move with the resulting conflicts. Browsers can't set
+# headers on a WebSocket, so the JWT comes in the "token" query parameter.
+router = APIRouter()
+
+
+async def authenticate(websocket: WebSocket, token: str):
+    try:
+        return verify_token(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return None
+
+
+async def send_error(websocket, detail):
+    await websocket.send_json({"type": "error", "detail": detail})
+
+
+def parse_message(text):
+    # Frames that aren't a JSON object are answered with an error like any
+    # other bad message; the stream stays open
+    message = json.loads(text)
+    if not isinstance(message, dict):
+        raise ValueError("Messages must be JSON objects")
+    return message
+
+
+# ------------------------------------------- N QUEENS -------------------------------------------
+async def queens_board(store, message):
+    # A registered room's colors, else the ones sent, else the default room's
+    room = await fixed_map_room(store, message.get("room_id") or DEFAULT_NQUEENS_ROOM)
+    if room and (message.get("room_id") or not message.get("colors")):
+        return room.colors, room
+    colors = message.get("colors") or predefined_colors[8]
+    n = len(colors)
+    if not 0 < n <= MAX_BOARD_SIZE or any(len(row) != n for row in colors):
+        raise ValueError(f"colors must be a square grid of at most {MAX_BOARD_SIZE} rows")
+    return colors, None
+
+
+def queens_event(state, kind, row=None):
+    event = {
+        "type": kind,
+        "board": state.board,
+        "invalid": sorted(state.invalid),
+        "valid": state.valid,
+        "complete": state.complete,
+    }
+    if row is not None:
+        event["row"] = row
+        event["attacked_by"] = state.attacked_by(row)
+    return event
+
+
+async def queens_hint(state, colors, room):
+    index = await room.solution_index() if room else await solution_index_for(colors)
+    if index:
+        return index.next_hint(state.board)
+    return await algorithm_executor.run(get_next_hint, state.board, colors)
+
+
+# Messages:
+#   {"type": "init", "room_id": "...", "colors": [[...]], "board": [...]}   all optional
+#   {"type": "place", "row": r, "col": c}
+#   {"type": "remove", "row": r}
+#   {"type": "hint"}
+# Every move is answered with the board, the rows in conflict and whether
+# the board is complete.
+@router.websocket("/stream")
+async def queens_stream(websocket: WebSocket, token: str = ""):
+    if await authenticate(websocket, token) is None:
+        return
+    await websocket.accept()
+
+    store = get_store()
+    colors, room = await queens_board(store, {})
+    state = QueensState(colors)
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = parse_message(text)
+                kind = message.get("type")
+                if kind == "init":
+                    colors, room = await queens_board(store, message)
+                    state = QueensState(colors, message.get("board"))
+                    await websocket.send_json({**queens_event(state, "state"), "colors": colors})
+                elif kind == "place":
+                    state.place(int(message["row"]), int(message["col"]))
+                    await websocket.send_json(queens_event(state, "move", int(message["row"])))
+                elif kind == "remove":
+                    state.remove(int(message["row"]))
+                    await websocket.send_json(queens_event(state, "move"))
+                elif kind == "hint":
+                    await websocket.send_json({"type": "hint", **await queens_hint(state, colors, room)})
+                else:
+                    await send_error(websocket, f"Unknown message type: {kind}")
+            except (KeyError, TypeError, ValueError) as exc:
+                await send_error(websocket, str(exc))
+            except (ExecutorSaturated, TaskTimeout):
+                await send_error(websocket, "Server busy, try again")
+    except WebSocketDisconnect:
+        pass
+
+
+# ------------------------------------------- SUDOKU -------------------------------------------
+def sudoku_event(state, kind, row=None, col=None):
+    event = {
+        "type": kind,
+        "valid": state.valid,
+        "complete": state.complete,
+        "remaining": state.remaining,
+    }
+    if row is not None:
+        event.update(row=row, col=col, value=state.cells[row * 9 + col], conflicts=state.conflicts(row, col))
+    return event
+
+
+async def load_sudoku(store, user_id, board=None):
+    session = await store.get_session(user_id)
+    if not session or not session.get("sudoku_solution"):
+        return None
+    return SudokuState(session["sudoku_board"], session["sudoku_solution"], board)
+
+
+# Messages:
+#   {"type": "init", "board": [[...]]}   reloads the session's puzzle; board optional
+#   {"type": "set", "row": r, "col": c, "value": v}   v = 0 clears the cell
+#   {"type": "hint"}
+# The puzzle comes from the session, so /sudoku/generate must be called first.
+@router.websocket("/sudoku/stream")
+async def sudoku_stream(websocket: WebSocket, token: str = ""):
+    user_id = await authenticate(websocket, token)
+    if user_id is None:
+        return
+    await websocket.accept()
+
+    store = get_store()
+    state = None
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                message = parse_message(text)
+                kind = message.get("type")
+                if kind == "init" or state is None:
+                    state = await load_sudoku(store, user_id, message.get("board") if kind == "init" else None)
+                    if state is None:
+                        await send_error(websocket, "No active Sudoku game found")
+                        continue
+                    if kind == "init":
+                        await websocket.send_json(sudoku_event(state, "state"))
+                        continue
+
+                if kind == "set":
+                    row, col = int(message["row"]), int(message["col"])
+                    state.set(row, col, int(message["value"]))
+                    await websocket.send_json(sudoku_event(state, "move", row, col))
+                elif kind == "hint":
+                    await websocket.send_json({"type": "hint", **state.hint()})
+                else:
+                    await send_error(websocket, f"Unknown message type: {kind}")
+            except (KeyError, TypeError, ValueError) as exc:
+                await send_error(websocket, str(exc))
+    except WebSocketDisconnect:
+        pass
@@ -0,0 +1,60 @@
+import os
+from ttl_cache import TTLCache
+
+# "local" trusts cached sessions; right for one worker or sticky routing.
+# "revalidate" checks the session's rev with a tiny projected read before
+# using a cached copy; safe when several workers serve the same user.
+# "off" disables the cache.
+SESSION_CACHE_MODE = os.getenv("SESSION_CACHE_MODE", "local")
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "900"))
+
+
+class CachedSessionStore:
+    # Write-through session cache in front of a MongoStore or MemoryStore.
+    # Every session write returns the updated document, which replaces the
+    # cached copy; everything else is delegated to the wrapped store.
+    def __init__(self, store, mode=SESSION_CACHE_MODE, maxsize=SESSION_CACHE_SIZE, ttl=SESSION_CACHE_TTL):
+        self.store = store
+        self.mode = mode
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.revalidations = 0
+        self.stale = 0
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+    def _remember(self, user_id, session):
+        if session:
+            self.cache.set(user_id, session)
+        return session
+
+    async def get_session(self, user_id):
+        session = self.cache.get(user_id)
+        if session is not None and self.mode == "revalidate":
+            self.revalidations += 1
+            if await self.store.get_revision(user_id) != session.get("rev"):
+                self.stale += 1
+                session = None
+        if session is None:
+            session = self._remember(user_id, await self.store.get_session(user_id))
+        return session
+
+    async def ensure_session(self, user_id):
+        return self._remember(user_id, await self.store.ensure_session(user_id))
+
+    async def start_puzzle(self, user_id, puzzle):
+        return self._remember(user_id, await self.store.start_puzzle(user_id, puzzle))
+
+    async def finish_puzzle(self, user_id, puzzle):
+        return self._remember(user_id, await self.store.finish_puzzle(user_id, puzzle))
+
+    async def set_sudoku(self, user_id, puzzle, solution):
+        session = await self.store.set_sudoku(user_id, puzzle, solution)
+        if not session:
+            # Completed elsewhere; don't keep serving an older copy
+            self.cache.pop(user_id)
+        return self._remember(user_id, session)
+
+    def stats(self):
+        return {**self.cache.stats(), "mode": self.mode, "revalidations": self.revalidations, "stale": self.stale}
@@ -0,0 +1,311 @@
+import logging
+import os
+from bisect import bisect_left, insort
+from datetime import datetime
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from database import ROOMS, get_db, close_db
+from models import GameState
+from helper import parse_total_time
+from algorithms.sudoku_core import encode
+from session_cache import CachedSessionStore, SESSION_CACHE_MODE
+from metrics import TimedStore, METRICS_ENABLED
+
+# "mongo" talks to MONGO_URL; "memory" keeps everything in process for tests,
+# benchmarks and load tests
+DATA_BACKEND = os.getenv("DATA_BACKEND", "mongo")
+
+logger = logging.getLogger(__name__)
+
+
+class DuplicateUser(Exception):
+    pass
+
+
+def puzzle_fields(puzzle):
+    return f"puzzle{puzzle}_start_time", f"puzzle{puzzle}_end_time"
+
+
+def duration_field(puzzle):
+    return f"puzzle{puzzle}_duration"
+
+
+# Sessions take part in the leaderboard once total_time holds seconds
+RANKED = {"total_time": {"$type": "number"}}
+
+
+def new_session_fields(*exclude):
+    return {k: v for k, v in GameState(user_id="").dict().items() if k != "user_id" and k not in exclude}
+
+
+class MongoStore:
+    def __init__(self, db):
+        self.users = db["users"]
+        self.sessions = db["game_sessions"]
+        self.rooms = db["rooms"]
+
+    async def init(self):
+        if await self.rooms.count_documents({}) == 0:
+            await self.rooms.insert_many([dict(room) for room in ROOMS])
+        # The session upserts (ensure_session, set_sudoku) rely on the unique
+        # user_id index to never insert a second session, so the app doesn't
+        # start without it
+        try:
+            await self.users.create_index("email", unique=True)
+            await self.sessions.create_index("user_id", unique=True)
+        except OperationFailure as exc:
+            logger.error("Could not create unique indexes; remove duplicate users or sessions first: %s", exc)
+            raise
+        await self.sessions.create_index("total_time", partialFilterExpression=RANKED)
+        await self.migrate_total_time()
+        await self.migrate_sudoku_encoding()
+        await self.migrate_room_puzzles()
+
+    async def migrate_total_time(self):
+        # Convert sessions finished before total_time was stored as seconds
+        async for session in self.sessions.find({"total_time": {"$type": "string"}}):
+            fields = {"total_time": parse_total_time(session["total_time"])}
+            for puzzle in (1, 2):
+                start, end = puzzle_fields(puzzle)
+                if session.get(start) and session.get(end):
+                    fields[duration_field(puzzle)] = (session[end] - session[start]).total_seconds()
+            await self.sessions.update_one({"_id": session["_id"]}, {"$set": fields})
+
+    async def migrate_sudoku_encoding(self):
+        # Sessions written before boards were stored as 81-digit strings
+        async for session in self.sessions.find({"sudoku_solution": {"$type": "array"}}):
+            await self.sessions.update_one({"_id": session["_id"]}, {"$set": {
+                "sudoku_board": encode(session["sudoku_board"]),
+                "sudoku_solution": encode(session["sudoku_solution"])
+            }})
+
+    async def migrate_room_puzzles(self):
+        # Rooms seeded before they carried a puzzle definition
+        for room in ROOMS:
+            if "puzzle" in room:
+                await self.rooms.update_one({"id": room["id"], "puzzle": {"$exists": False}},
+                                            {"$set": {"puzzle": room["puzzle"]}})
+
+    async def close(self):
+        close_db()
+
+    # -------- ROOMS --------
+    async def list_rooms(self):
+        return await self.rooms.find({}, {"_id": 0}).to_list(length=None)
+
+    # -------- USERS --------
+    async def find_user(self, email):
+        return await self.users.find_one({"email": email})
+
+    async def create_user(self, user):
+        try:
+            await self.users.insert_one(user)
+        except DuplicateKeyError:
+            raise DuplicateUser(user["email"])
+
+    async def set_password(self, email, hashed_password):
+        await self.users.update_one({"email": email}, {"$set": {"password": hashed_password}})
+
+    # -------- SESSIONS --------
+    async def get_session(self, user_id):
+        return await self.sessions.find_one({"user_id": user_id})
+
+    async def ensure_session(self, user_id):
+        return await self.sessions.find_one_and_update(
+            {"user_id": user_id},
+            {"$setOnInsert": new_session_fields()},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+
+    # Every write bumps "rev" so other workers can tell a cached session is stale
+
+    async def start_puzzle(self, user_id, puzzle):
+        # The session if started now, False if already started, None if no session
+        start, _ = puzzle_fields(puzzle)
+        session = await self.sessions.find_one_and_update(
+            {"user_id": user_id, start: None},
+            {"$set": {start: datetime.utcnow()}, "$inc": {"rev": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if session:
+            return session
+        exists = await self.sessions.find_one({"user_id": user_id}, {"_id": 1})
+        return False if exists else None
+
+    async def finish_puzzle(self, user_id, puzzle):
+        # Returns the updated session, False if the puzzle was never started,
+        # None if there is no session
+        start, end = puzzle_fields(puzzle)
+        now = datetime.utcnow()
+        seconds = {"$divide": [{"$subtract": [now, "$" + start]}, 1000]}
+        session = await self.sessions.find_one_and_update(
+            {"user_id": user_id, start: {"$ne": None}},
+            [{"$set": {
+                end: now,
+                duration_field(puzzle): seconds,
+                "total_time": seconds,
+                "rev": {"$add": [{"$ifNull": ["$rev", 0]}, 1]}
+            }}],
+            return_document=ReturnDocument.AFTER
+        )
+        if session:
+            return session
+        exists = await self.sessions.find_one({"user_id": user_id}, {"_id": 1})
+        return False if exists else None
+
+    async def set_sudoku(self, user_id, puzzle, solution):
+        # Creates the session if needed and returns it; False if Sudoku is
+        # already completed. A completed session fails the filter and the
+        # upsert then collides with the unique user_id index. Boards are
+        # stored as compact 81-digit strings.
+        _, end = puzzle_fields(2)
+        try:
+            return await self.sessions.find_one_and_update(
+                {"user_id": user_id, end: None},
+                {
+                    "$set": {"sudoku_board": encode(puzzle), "sudoku_solution": encode(solution)},
+                    "$inc": {"rev": 1},
+                    "$setOnInsert": new_session_fields(end)
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            return False
+
+    async def get_revision(self, user_id):
+        session = await self.sessions.find_one({"user_id": user_id}, {"rev": 1})
+        return session.get("rev") if session else None
+
+    # -------- LEADERBOARD --------
+    async def usernames(self, emails):
+        users = self.users.find({"email": {"$in": emails}}, {"email": 1, "username": 1})
+        return {user["email"]: user.get("username") async for user in users}
+
+    async def top_sessions(self, offset, limit):
+        # Served from the partial index on total_time
+        cursor = self.sessions.find(RANKED).sort("total_time", 1).skip(offset).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def count_faster(self, total_time):
+        return await self.sessions.count_documents({"total_time": {"$type": "number", "$lt": total_time}})
+
+    async def count_ranked(self):
+        return await self.sessions.count_documents(RANKED)
+
+
+class MemoryStore:
+    # Same contract as MongoStore. Every method runs without awaiting, so each
+    # one is atomic on the event loop.
+    def __init__(self):
+        self.users = {}
+        self.sessions = {}
+        self.rooms = []
+        # Sorted (total_time, user_id) pairs for the leaderboard
+        self.ranking = []
+
+    async def init(self):
+        if not self.rooms:
+            self.rooms = [dict(room) for room in ROOMS]
+
+    async def close(self):
+        pass
+
+    async def list_rooms(self):
+        return [dict(room) for room in self.rooms]
+
+    async def find_user(self, email):
+        user = self.users.get(email)
+        return dict(user) if user else None
+
+    async def create_user(self, user):
+        if user["email"] in self.users:
+            raise DuplicateUser(user["email"])
+        self.users[user["email"]] = dict(user)
+
+    async def set_password(self, email, hashed_password):
+        if email in self.users:
+            self.users[email]["password"] = hashed_password
+
+    async def get_session(self, user_id):
+        session = self.sessions.get(user_id)
+        return dict(session) if session else None
+
+    async def ensure_session(self, user_id):
+        if user_id not in self.sessions:
+            self.sessions[user_id] = GameState(user_id=user_id).dict()
+        return dict(self.sessions[user_id])
+
+    async def start_puzzle(self, user_id, puzzle):
+        start, _ = puzzle_fields(puzzle)
+        session = self.sessions.get(user_id)
+        if session is None:
+            return None
+        if session.get(start) is not None:
+            return False
+        session[start] = datetime.utcnow()
+        session["rev"] = session.get("rev", 0) + 1
+        return dict(session)
+
+    async def finish_puzzle(self, user_id, puzzle):
+        start, end = puzzle_fields(puzzle)
+        session = self.sessions.get(user_id)
+        if session is None:
+            return None
+        if session.get(start) is None:
+            return False
+        now = datetime.utcnow()
+        seconds = (now - session[start]).total_seconds()
+        if session.get("total_time") is not None:
+            self.ranking.remove((session["total_time"], user_id))
+        session[end] = now
+        session[duration_field(puzzle)] = seconds
+        session["total_time"] = seconds
+        session["rev"] = session.get("rev", 0) + 1
+        insort(self.ranking, (seconds, user_id))
+        return dict(session)
+
+    async def set_sudoku(self, user_id, puzzle, solution):
+        _, end = puzzle_fields(2)
+        session = self.sessions.setdefault(user_id, GameState(user_id=user_id).dict())
+        if session.get(end) is not None:
+            return False
+        session["sudoku_board"] = encode(puzzle)
+        session["sudoku_solution"] = encode(solution)
+        session["rev"] = session.get("rev", 0) + 1
+        return dict(session)
+
+    async def get_revision(self, user_id):
+        session = self.sessions.get(user_id)
+        return session.get("rev") if session else None
+
+    async def usernames(self, emails):
+        return {email: self.users[email].get("username") for email in emails if email in self.users}
+
+    async def top_sessions(self, offset, limit):
+        return [dict(self.sessions[user_id]) for _, user_id in self.ranking[offset:offset + limit]]
+
+    async def count_faster(self, total_time):
+        return bisect_left(self.ranking, (total_time,))
+
+    async def count_ranked(self):
+        return len(self.ranking)
+
+
+def create_store(backend=DATA_BACKEND):
+    if backend == "memory":
+        base = MemoryStore()
+    else:
+        base = MongoStore(get_db())
+    # Timed below the session cache, so cache hits don't count as DB time
+    if METRICS_ENABLED:
+        base = TimedStore(base, backend)
+    return CachedSessionStore(base) if SESSION_CACHE_MODE != "off" else base
+
+
+store = create_store()
+
+
+def get_store():
+    return store
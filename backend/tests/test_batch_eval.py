@@ -0,0 +1,47 @@
+import random
+import pytest
+from algorithms import batch_eval, bitmask_solver
+from algorithms.dp_validator import conflicting_rows, is_valid_board
+from algorithms.queens_generator import random_queens, grow_regions
+
+SEEDS = range(40)
+
+
+def random_map(n, rng):
+    if rng.random() < 0.5:
+        return grow_regions(n, random_queens(n, rng), rng)
+    return [[rng.randrange(n) for _ in range(n)] for _ in range(n)]
+
+
+def random_boards(n, rng, count=200):
+    # Mostly partial boards with clashes, plus a few solutions
+    boards = [[rng.randrange(-1, n) for _ in range(n)] for _ in range(count)]
+    boards += [rng.sample(range(n), n) for _ in range(count // 4)]
+    return boards
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_matches_dp_validator(seed):
+    rng = random.Random(seed)
+    n = rng.randint(4, 12)
+    colors = random_map(n, rng)
+    boards = random_boards(n, rng)
+
+    assert batch_eval.conflicting_rows_many(boards, colors) == [conflicting_rows(board, colors) for board in boards]
+    assert batch_eval.is_valid_many(boards, colors) == [is_valid_board(board, colors) for board in boards]
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_count_solutions_matches_bitmask_solver(seed):
+    rng = random.Random(seed)
+    n = rng.randint(4, batch_eval.MAX_PERMUTATION_SIZE)
+    colors = random_map(n, rng)
+    assert batch_eval.count_solutions(colors) == bitmask_solver.count_solutions(colors)
+
+
+def test_rejects_boards_that_dont_fit_the_map():
+    colors = [[0, 1, 2, 3]] * 4
+    with pytest.raises(ValueError):
+        batch_eval.is_valid_many([[0, 1, 2]], colors)
+    with pytest.raises(ValueError):
+        batch_eval.is_valid_many([[0, 1, 2, 4]], colors)
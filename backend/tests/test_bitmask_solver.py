@@ -0,0 +1,66 @@
+import random
+from itertools import permutations
+import pytest
+from algorithms import backtracking_solver
+from algorithms.bitmask_solver import iter_solutions, solve_n_queens, count_solutions
+from algorithms.dp_validator import is_valid_board
+from algorithms.queens_generator import random_queens, grow_regions
+
+SEEDS = range(40)
+
+
+def random_map(n, rng):
+    # Solvable maps grown around a queen layout, and noise maps that rarely are
+    if rng.random() < 0.5:
+        return grow_regions(n, random_queens(n, rng), rng)
+    return [[rng.randrange(n) for _ in range(n)] for _ in range(n)]
+
+
+def brute_force_solutions(colors):
+    n = len(colors)
+    return sorted(list(p) for p in permutations(range(n)) if is_valid_board(list(p), colors))
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_matches_backtracking_solver(seed):
+    rng = random.Random(seed)
+    n = rng.randint(4, 7)
+    colors = random_map(n, rng)
+
+    expected = backtracking_solver.solve_n_queens(n, colors)
+    solution = solve_n_queens(n, colors)
+    assert (solution is None) == (expected is None)
+    if solution is not None:
+        assert is_valid_board(solution, colors)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_enumerates_every_solution(seed):
+    rng = random.Random(seed)
+    n = rng.randint(4, 7)
+    colors = random_map(n, rng)
+
+    expected = brute_force_solutions(colors)
+    assert sorted(iter_solutions(colors)) == expected
+    assert count_solutions(colors) == len(expected)
+    first = backtracking_solver.solve_n_queens(n, colors)
+    assert first is None or first in expected
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_placed_queens_constrain_the_search(seed):
+    rng = random.Random(seed)
+    n = rng.randint(4, 7)
+    colors = grow_regions(n, random_queens(n, rng), rng)
+    solutions = brute_force_solutions(colors)
+
+    board = [-1] * n
+    row = rng.randrange(n)
+    board[row] = rng.randrange(n)
+    expected = [s for s in solutions if s[row] == board[row]]
+    assert sorted(iter_solutions(colors, board)) == expected
+
+
+def test_rejects_mismatched_size():
+    colors = [[0, 1, 2, 3]] * 4
+    assert solve_n_queens(5, colors) is None
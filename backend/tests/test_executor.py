@@ -0,0 +1,44 @@
+import asyncio
+import os
+import pytest
+from algorithms.executor import AlgorithmExecutor, ExecutorSaturated
+
+
+def crash(flag):
+    # Kills the worker process while the flag file exists
+    if flag is None or os.path.exists(flag):
+        if flag:
+            os.remove(flag)
+        os._exit(1)
+    return "done"
+
+
+@pytest.fixture
+def executor():
+    executor = AlgorithmExecutor(kind="process", workers=1, timeout=30, max_pending=0)
+    executor.start()
+    yield executor
+    executor.shutdown()
+
+
+def test_rebuilds_a_broken_pool(executor, tmp_path):
+    flag = tmp_path / "crash"
+    flag.touch()
+    assert executor.call(crash, str(flag)) == "done"
+    assert executor.restarts == 1
+    assert executor.call(crash, str(tmp_path / "missing")) == "done"
+    assert executor.restarts == 1
+
+
+def test_async_run_rebuilds_a_broken_pool(executor, tmp_path):
+    flag = tmp_path / "crash"
+    flag.touch()
+    assert asyncio.run(executor.run(crash, str(flag))) == "done"
+    assert executor.restarts == 1
+
+
+def test_gives_up_after_one_retry(executor):
+    with pytest.raises(ExecutorSaturated):
+        executor.call(crash, None)
+    assert executor.restarts == 2
+    assert executor.pending == 0
@@ -0,0 +1,96 @@
+import random
+import pytest
+from algorithms import sudoku_core
+from algorithms.sudoku_core import Grid, flatten, to_grid
+from algorithms.sudoku_hint import is_valid_move
+
+SEEDS = range(40)
+
+
+def scan_is_valid(board):
+    # The row / column / box scan sudoku_core replaced
+    def is_valid_group(group):
+        nums = [n for n in group if n != 0]
+        return len(nums) == len(set(nums))
+
+    groups = list(board) + [list(col) for col in zip(*board)]
+    groups += [[board[x][y] for x in range(i, i + 3) for y in range(j, j + 3)]
+               for i in range(0, 9, 3) for j in range(0, 9, 3)]
+    return all(is_valid_group(group) for group in groups)
+
+
+def random_board(rng):
+    # A solved grid with random cells cleared, and sometimes a random digit
+    # dropped in that may clash with its row, column or box. solve() shuffles
+    # with the module-level generator, so that one is seeded too.
+    random.seed(rng.random())
+    cells = sudoku_core.solve([0] * 81, shuffle=True)
+    for i in rng.sample(range(81), rng.randint(20, 70)):
+        cells[i] = 0
+    for _ in range(rng.choice([0, 0, 1, 2])):
+        cells[rng.randrange(81)] = rng.randint(1, 9)
+    return to_grid(cells)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_is_valid_matches_scan(seed):
+    board = random_board(random.Random(seed))
+    expected = scan_is_valid(board)
+    assert sudoku_core.is_valid(flatten(board)) == expected
+    assert Grid(flatten(board)).is_valid() == expected
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_can_place_matches_scan(seed):
+    rng = random.Random(seed)
+    board = random_board(rng)
+    grid = Grid(flatten(board))
+    for _ in range(50):
+        row, col, num = rng.randrange(9), rng.randrange(9), rng.randint(1, 9)
+        assert grid.can_place(row * 9 + col, num) == is_valid_move(board, row, col, num)
+        assert is_valid_move(grid, row, col, num) == is_valid_move(board, row, col, num)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_solutions_pass_scan(seed):
+    board = random_board(random.Random(seed))
+    solution = sudoku_core.solve(flatten(board))
+    if not scan_is_valid(board):
+        assert solution is None
+        assert sudoku_core.count_solutions(flatten(board)) == 0
+        return
+    if solution is not None:
+        grid = to_grid(solution)
+        assert scan_is_valid(grid)
+        assert all(grid[r][c] == board[r][c] for r in range(9) for c in range(9) if board[r][c])
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_encode_round_trip(seed):
+    board = random_board(random.Random(seed))
+    assert sudoku_core.decode(sudoku_core.encode(board)) == flatten(board)
+    assert sudoku_core.as_cells(board) == flatten(board)
+
+
+@pytest.mark.parametrize("text", ["", "0" * 80, "0" * 82, "0" * 80 + "a", "0" * 80 + "²", "0" * 80 + "é"])
+def test_decode_rejects_anything_but_81_digits(text):
+    with pytest.raises(ValueError):
+        sudoku_core.decode(text)
+
+
+@pytest.mark.parametrize("board", [
+    [[0] * 9] * 8,
+    [[0] * 9] * 8 + [[0] * 10],
+    [[0] * 9] * 8 + [[0] * 8 + [10]],
+    [[0] * 9] * 8 + [[0] * 8 + [-1]],
+    "0" * 80,
+])
+def test_parse_board_rejects_malformed_boards(board):
+    with pytest.raises(ValueError):
+        sudoku_core.parse_board(board)
+
+
+def test_parse_board_accepts_grid_and_string():
+    board = random_board(random.Random(0))
+    assert sudoku_core.parse_board(board) == flatten(board)
+    assert sudoku_core.parse_board(sudoku_core.encode(board)) == flatten(board)